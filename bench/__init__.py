@@ -0,0 +1 @@
+"""bench — benchmarks that run on the offline simulator (see sim/)."""
@@ -0,0 +1,137 @@
+"""
+bench/db.py
+Per-call cost of db/database.py: connection-per-call vs. the shared
+WAL connection.
+
+"legacy" swaps get_conn() back to the old behaviour (makedirs + a new
+sqlite3 connection for every call, default rollback journal, no user
+row cache) on a copy of the same database, so both modes run the real
+query functions against identical data.
+
+  python -m bench.db
+  python -m bench.db --users 10000,50000 --calls 5000 --out bench_db.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import sim  # noqa: F401  (env defaults before config is imported)
+from db import database as db
+
+SEED = 7
+
+
+def _legacy_conn():
+    dir_name = os.path.dirname(db.DB_PATH)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+    conn = sqlite3.connect(db.DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _populate(path: str, users: int):
+    db.close_db()
+    db.DB_PATH = path
+    db.init_db()
+    rows = [(uid, f"user{uid}", f"User {uid}", "eyJ" + "x" * 60,
+             1 if uid % 3 else 0, "2099-01-01T00:00:00", 1 if uid % 97 == 0 else 0)
+            for uid in range(1, users + 1)]
+    with db.get_conn() as c:
+        c.executemany("""
+            INSERT INTO user_settings(user_id,username,first_name,token,
+                                      is_subscribed,sub_expiry,is_banned)
+            VALUES(?,?,?,?,?,?,?)
+        """, rows)
+    db.close_db()
+
+
+OPS = {
+    "get_user":    lambda uid: db.get_user(uid),
+    "is_allowed":  lambda uid: db.is_allowed(uid),
+    "get_batches": lambda uid: db.get_batches(uid),
+    "set_token":   lambda uid: db.set_token(uid, "eyJ" + "y" * 60),
+    "upsert_user": lambda uid: db.upsert_user(uid, f"user{uid}", "Renamed"),
+}
+
+
+def _time_ops(users: int, calls: int) -> dict:
+    rand = random.Random(SEED)
+    uids = [rand.randint(1, users) for _ in range(calls)]
+    out = {}
+    for name, op in OPS.items():
+        t0 = time.perf_counter()
+        for uid in uids:
+            op(uid)
+        out[name] = (time.perf_counter() - t0) / calls * 1e6
+    return out
+
+
+def run_case(users: int, calls: int, tmp: str) -> dict:
+    pooled_path = os.path.join(tmp, f"pooled_{users}.db")
+    legacy_path = os.path.join(tmp, f"legacy_{users}.db")
+    _populate(pooled_path, users)
+    shutil.copy(pooled_path, legacy_path)
+    with sqlite3.connect(legacy_path) as c:
+        c.execute("PRAGMA journal_mode=DELETE")
+
+    get_conn, cache_size = db.get_conn, db.USER_CACHE_SIZE
+    try:
+        db.DB_PATH, db.get_conn, db.USER_CACHE_SIZE = legacy_path, _legacy_conn, 0
+        legacy = _time_ops(users, calls)
+    finally:
+        db.get_conn, db.USER_CACHE_SIZE = get_conn, cache_size
+        db.close_db()
+
+    db.DB_PATH = pooled_path
+    pooled = _time_ops(users, calls)
+    db.close_db()
+
+    return {
+        "users": users,
+        "calls": calls,
+        "ops": {
+            name: {
+                "legacy_us": round(legacy[name], 1),
+                "pooled_us": round(pooled[name], 1),
+                "speedup":   round(legacy[name] / pooled[name], 1),
+            }
+            for name in OPS
+        },
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-call cost of the DB layer, legacy vs pooled")
+    ap.add_argument("--users", default="10000,50000")
+    ap.add_argument("--calls", type=int, default=5000, help="calls per operation")
+    ap.add_argument("--out", help="write JSON here instead of stdout")
+    a = ap.parse_args()
+
+    cases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for users in map(int, a.users.split(",")):
+            r = run_case(users, a.calls, tmp)
+            cases.append(r)
+            for name, o in r["ops"].items():
+                print(f"[bench] {users:>6} users  {name:<12} "
+                      f"legacy {o['legacy_us']:8.1f} µs  pooled {o['pooled_us']:7.1f} µs  "
+                      f"×{o['speedup']}")
+
+    out = json.dumps({"cases": cases}, indent=2)
+    if a.out:
+        with open(a.out, "w") as f:
+            f.write(out + "\n")
+        print(f"[bench] ✅ {a.out}")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
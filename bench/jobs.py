@@ -0,0 +1,137 @@
+"""
+bench/jobs.py
+Phase-level benchmark of complete extraction jobs.
+
+Each case runs run_extractor → run_uploader (prompts + monitoring)
+against the scripted peers in sim/ on a virtual clock, with peer
+latencies modelled on the live bots. Per case it reports the modelled
+wall time of every phase, dead time (sleeps/pacing) versus time spent
+waiting on a peer, and the API calls issued — so a regression in
+core/uploader.py or core/userbot.py shows up as numbers.
+
+  python -m bench.jobs
+  python -m bench.jobs --files 1,10,200 --channels 1,3 --out bench_jobs.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+# Production pacing, not the simulator's shortened defaults
+os.environ.setdefault("UB_MIN_GAP", "1.5")
+os.environ.setdefault("UB_GAP_POLL", "30")
+
+import sim  # noqa: F401  (env defaults before config is imported)
+from sim.clock import run_virtual
+from sim.client import SimClient
+from sim.peers import ExtractorPeer, UploaderPeer
+from core.userbot import use_client
+from core import ratelimit, txtcache
+from core.metrics import job_metrics
+from core.extractor import run_extractor
+from core.uploader import run_uploader
+
+BATCH = "Bench Batch"
+TOKEN = "eyJ" + "x" * 60
+
+# Modelled peer behaviour, seconds
+PROFILE = {
+    "latency":      1.0,    # ordinary reply
+    "list_delay":   90,     # batch list after token (~2 min)
+    "choice_delay": 45,     # choice prompt after batch number (~1 min)
+    "txt_delay":    150,    # .txt after choice (2-3 min)
+    "media_delay":  6,      # uploader posts one file every N s
+}
+
+PHASES = {
+    "start":            ["ext:start"],
+    "token":            ["ext:token"],
+    "batch_list":       ["ext:batches"],
+    "choice":           ["ext:choice"],
+    "txt":              ["ext:txt"],
+    "uploader_prompts": "upl:",
+    "monitoring":       ["upl:monitor"],
+}
+
+
+def _phases(steps: list) -> dict:
+    out = {}
+    for phase, names in PHASES.items():
+        if isinstance(names, str):
+            hit = [s for s in steps if s["name"].startswith(names) and s["name"] != "upl:monitor"]
+        else:
+            hit = [s for s in steps if s["name"] in names]
+        out[phase] = {
+            "wall":   round(sum(s["secs"] for s in hit), 2),
+            "dead":   round(sum(s["slept"] for s in hit), 2),
+            "peer":   round(sum(s["waited"] for s in hit), 2),
+        }
+    return out
+
+
+async def run_case(files: int, channels: int, profile: dict) -> dict:
+    videos = files if files < 5 else files * 4 // 5
+    client = SimClient()
+    ext = ExtractorPeer(batches=["Other Batch", BATCH], videos=videos, pdfs=files - videos,
+                        latency=profile["latency"], list_delay=profile["list_delay"],
+                        choice_delay=profile["choice_delay"], txt_delay=profile["txt_delay"])
+    upl = UploaderPeer(latency=profile["latency"], media_delay=profile["media_delay"])
+    client.attach(ext)
+    client.attach(upl)
+    chans = [str(-1001000000000 - i) for i in range(channels)]
+    for ch in chans:
+        client.add_channel(int(ch))
+    use_client(client)
+    ratelimit.reset()
+    shutil.rmtree(txtcache.CACHE_DIR, ignore_errors=True)   # every case extracts
+
+    m = job_metrics()
+    txt  = await run_extractor(ext.username, TOKEN, BATCH)
+    res  = await run_uploader(upl.username, upl.secret, txt, BATCH, "@bench", TOKEN, chans)
+    s = m.summary()
+    return {
+        "files":       files,
+        "channels":    channels,
+        "forwarded":   res,
+        "copies":      sum(len(client.history[int(ch)]) for ch in chans),
+        "wall":        s["wall"],
+        "dead":        s["slept"],
+        "peer_wait":   s["waited"],
+        "phases":      _phases(m.steps),
+        "calls_total": sum(client.calls.values()),
+        "calls":       dict(client.calls),
+        "limiter":     {k: v for k, v in ratelimit.snapshot().items() if v["calls"]},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Phase-level benchmark of full jobs (simulated)")
+    ap.add_argument("--files", default="1,10,200")
+    ap.add_argument("--channels", default="1,3")
+    ap.add_argument("--out", help="write JSON here instead of stdout")
+    a = ap.parse_args()
+
+    cases = []
+    for files in map(int, a.files.split(",")):
+        for channels in map(int, a.channels.split(",")):
+            t0 = time.perf_counter()
+            r  = run_virtual(run_case(files, channels, PROFILE))
+            r["cpu"] = round(time.perf_counter() - t0, 3)
+            cases.append(r)
+            print(f"[bench] {files:>4} files × {channels} ch → "
+                  f"{r['wall']:8.1f}s modelled  dead {r['dead']:7.1f}s  "
+                  f"peer {r['peer_wait']:7.1f}s  calls {r['calls_total']}")
+
+    out = json.dumps({"profile": PROFILE, "cases": cases}, indent=2)
+    if a.out:
+        with open(a.out, "w") as f:
+            f.write(out + "\n")
+        print(f"[bench] ✅ {a.out}")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Python 3.11+ Safe
 """
 
 import sys
+import signal
 import asyncio
 from pyrogram import Client
 
@@ -16,11 +17,14 @@ if sys.platform != "win32":
         pass
 
 from config import BOT_TOKEN, API_ID, API_HASH, SUDO_USERS
-from db.database import init_db
+from db.database import init_db, close_db
+from db import aio
 from core.userbot import start_userbot, stop_userbot  # ✅ import instance directly
+from core import ratelimit, jobqueue, broadcast
 from handlers.start import register_start
 from handlers.settings import register_settings
-from handlers.extraction import register_extraction
+from handlers.extraction import register_extraction, run_extraction_job
+from handlers.replicate import register_replicate, run_replicate_job
 from handlers.admin import register_admin
 
 
@@ -46,26 +50,46 @@ async def main():
     register_start(bot)
     register_settings(bot)
     register_extraction(bot)
+    register_replicate(bot)
     register_admin(bot)
     print("[Boot] ✅ Handlers registered")
 
     # 5️⃣ Start bot
-    await start_userbot()
+    await bot.start()
     me = await bot.get_me()
     print(f"[Boot] ✅ Bot running as @{me.username}")
 
-    # 6️⃣ Notify sudo users
+    # 6️⃣ Job workers (resumes jobs interrupted by the last shutdown)
+    runners = {"extract": run_extraction_job, "replicate": run_replicate_job}
+    await jobqueue.start(lambda job: runners[job["kind"] or "extract"](bot, job))
+    n = await broadcast.resume(bot)
+    if n:
+        print(f"[Boot] ♻️ Resumed {n} broadcast(s)")
+
+    # 7️⃣ Notify sudo users
     for uid in SUDO_USERS:
         if uid:
             try:
-                await bot.send_message(uid, "🟢 Bot Online!")
+                await ratelimit.call("bot", bot.send_message, uid, "🟢 Bot Online!")
             except:
                 pass
 
     print("[Boot] 🚀 Polling started...")
 
-    # Keep running forever
-    await asyncio.Event().wait()
+    # Keep running until SIGTERM (redeploy) / Ctrl+C
+    stop = asyncio.Event()
+    if sys.platform != "win32":
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        print("[Shutdown] Handing running jobs back to the queue...")
+        await jobqueue.stop()
+        await broadcast.stop()
+        await bot.stop()
+        await stop_userbot()
+        aio.shutdown()            # let queued writes land first
+        close_db()
 
 
 if __name__ == "__main__":
@@ -22,6 +22,7 @@ SUDO_USERS  = list(map(int, os.environ.get("SUDO_USERS", "0").split(",")))
 
 # ── Database path ──
 DB_PATH     = os.environ.get("DB_PATH", "bot.db")
+USER_CACHE_SIZE   = int(os.environ.get("USER_CACHE_SIZE", 5000))  # user rows kept in memory
 
 # ── Fixed values (never change these) ──
 RESOLUTION        = "480"
@@ -29,3 +30,35 @@ START_INDEX       = "1"
 THUMBNAIL         = "no"
 PW_BUTTON_TEXT    = "Physics Wallah"
 WAIT_CHOICE       = "2"
+
+# ── Userbot update dispatcher (seconds) ──
+UB_GAP_POLL       = float(os.environ.get("UB_GAP_POLL", 30))     # history sweep fallback
+UB_BACKFILL_LIMIT = int(os.environ.get("UB_BACKFILL_LIMIT", 50))  # msgs per sweep
+UB_MIN_GAP        = float(os.environ.get("UB_MIN_GAP", 1.5))     # between sends to one bot
+
+# ── Forwarding to target channels ──
+FWD_QUEUE_MAX     = int(os.environ.get("FWD_QUEUE_MAX", 50))        # per-channel backlog
+FWD_BATCH_MAX     = int(os.environ.get("FWD_BATCH_MAX", 100))       # messages per bulk forward (Telegram max 100)
+FWD_CHANNEL_GAP   = float(os.environ.get("FWD_CHANNEL_GAP", 1.5))   # secs between copies to one channel
+FWD_MAX_PER_SEC   = float(os.environ.get("FWD_MAX_PER_SEC", 20))    # copies/s across all channels
+
+# ── API rate limits (calls/sec per method class; FloodWaits are honoured on top) ──
+RL_READ           = float(os.environ.get("RL_READ", 5))           # history / get_messages
+RL_BOT_SEND       = float(os.environ.get("RL_BOT_SEND", 25))      # bot → users (broadcast)
+RL_BOT_EDIT       = float(os.environ.get("RL_BOT_EDIT", 10))      # status-message edits
+PROGRESS_EVERY    = float(os.environ.get("PROGRESS_EVERY", 5))   # min secs between one job's status edits
+FLOOD_MAX_WAIT    = float(os.environ.get("FLOOD_MAX_WAIT", 900))  # longer waits are not retried
+FLOOD_RETRIES     = int(os.environ.get("FLOOD_RETRIES", 5))
+
+# ── Job queue ──
+JOB_WORKERS       = int(os.environ.get("JOB_WORKERS", 3))          # jobs run at once
+JOB_LEASE         = float(os.environ.get("JOB_LEASE", 120))        # secs a claim lasts without heartbeat
+JOB_POLL          = float(os.environ.get("JOB_POLL", 10))          # idle workers re-check the queue
+JOB_MAX_ATTEMPTS  = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))     # restarts before a job is failed
+
+# ── Extractor .txt cache (core/txtcache.py) ──
+TXT_CACHE_TTL     = float(os.environ.get("TXT_CACHE_TTL", 6 * 3600))  # secs a cached .txt is reused
+TXT_CACHE_MAX     = int(os.environ.get("TXT_CACHE_MAX", 1000))        # entries; oldest evicted beyond this
+
+# ── Broadcasts ──
+BCAST_SENDERS     = int(os.environ.get("BCAST_SENDERS", 8))        # sends in flight (within RL_BOT_SEND)
@@ -0,0 +1,118 @@
+"""
+core/broadcast.py
+Resumable /broadcast runs.
+
+A broadcast is a `broadcasts` row plus one `broadcast_recipients` row
+per user, marked as each send finishes. BCAST_SENDERS senders share the
+"bot" rate-limit class, so a FloodWait pauses all of them instead of
+failing the rest of the list. resume() restarts unfinished broadcasts
+after a restart from the first unmarked recipient. Users who blocked
+the bot are flagged and left out of later broadcasts.
+"""
+
+import asyncio
+from collections import deque
+from pyrogram.errors import UserIsBlocked, InputUserDeactivated
+from core import ratelimit
+from db import aio
+from db.aio import (
+    get_broadcast, get_open_broadcasts, get_pending_recipients,
+    mark_recipient, finish_broadcast
+)
+from config import BCAST_SENDERS, PROGRESS_EVERY
+
+# Only these mean the user is gone for good; PeerIdInvalid (e.g. no cached
+# access hash after a session reset) is counted as a plain failure.
+UNREACHABLE = (UserIsBlocked, InputUserDeactivated)
+
+_tasks: dict[int, asyncio.Task] = {}
+
+
+def start(bot, bid: int):
+    """Run broadcast `bid` in the background (no-op if it already runs)."""
+    if bid in _tasks:
+        return
+    task = asyncio.get_running_loop().create_task(_run(bot, bid))
+    _tasks[bid] = task
+    task.add_done_callback(lambda _: _tasks.pop(bid, None))
+
+
+async def resume(bot) -> int:
+    """Restart every broadcast a previous run left unfinished."""
+    rows = await get_open_broadcasts()
+    for b in rows:
+        start(bot, b["id"])
+    return len(rows)
+
+
+def running() -> list[int]:
+    return list(_tasks)
+
+
+async def stop():
+    """Stop all runs; unmarked recipients are sent to after the next resume()."""
+    tasks = list(_tasks.values())
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run(bot, bid: int):
+    b       = await get_broadcast(bid)
+    pending = deque(await get_pending_recipients(bid))
+    print(f"[Broadcast {bid}] {len(pending)} of {b['total']} recipients left")
+
+    async def sender():
+        while pending:
+            uid = pending.popleft()
+            try:
+                await ratelimit.call("bot", bot.send_message, uid, b["text"], parse_mode="markdown")
+                status = "sent"
+            except UNREACHABLE:
+                status = "blocked"
+            except Exception:
+                status = "failed"
+            # ordered behind earlier marks on the DB thread, not awaited
+            aio.submit(mark_recipient, bid, uid, status)
+
+    reporter = asyncio.get_running_loop().create_task(_report(bot, bid))
+    try:
+        await asyncio.gather(*(sender() for _ in range(min(BCAST_SENDERS, len(pending)))))
+    finally:
+        reporter.cancel()
+
+    await finish_broadcast(bid)
+    b = await get_broadcast(bid)
+    await _show(bot, b, (
+        f"📢 **Broadcast Done**\n"
+        f"✅ Sent: {b['sent']}\n🚫 Blocked: {b['blocked']}\n❌ Failed: {b['failed']}"
+    ))
+    print(f"[Broadcast {bid}] done — {b['sent']} sent, {b['blocked']} blocked, {b['failed']} failed")
+
+
+async def _report(bot, bid: int):
+    last = None
+    while True:
+        await asyncio.sleep(PROGRESS_EVERY)
+        b    = await get_broadcast(bid)
+        left = b["total"] - b["sent"] - b["blocked"] - b["failed"]
+        text = (
+            f"📢 **Broadcasting...**\n"
+            f"✅ Sent: {b['sent']}\n🚫 Blocked: {b['blocked']}\n❌ Failed: {b['failed']}\n"
+            f"⏳ Left: {left} of {b['total']}"
+        )
+        if text != last:
+            await _show(bot, b, text, wait=False)
+            last = text
+
+
+async def _show(bot, b: dict, text: str, wait: bool = True):
+    if not b["status_msg"]:
+        return
+    try:
+        await ratelimit.call(
+            "edit", bot.edit_message_text, b["status_chat"], b["status_msg"],
+            text, parse_mode="markdown", key=b["status_chat"], wait=wait
+        )
+    except Exception:
+        pass
@@ -0,0 +1,155 @@
+"""
+core/dialog.py
+Declarative conversation engine for peer bots.
+
+A dialog is a list of Intents — how to recognise a prompt, what to
+answer, how long to wait for it. The engine answers whichever open
+intent the next message matches, so the peer bot may ask in any order
+or fold two questions into one message. Adding a new peer bot means
+writing a new intent list, not a new code path.
+"""
+
+import inspect
+from dataclasses import dataclass
+from pyrogram.types import Message
+from core.userbot import ub_send, ub_wait_reply
+from core import metrics
+
+MERGE_GRACE = 5   # secs to wait for a separate prompt before answering a merged one
+
+
+class DialogError(Exception):
+    pass
+
+
+@dataclass
+class Intent:
+    name:    str
+    words:   tuple = ()       # distinctive keywords (any order)
+    loose:   tuple = ()       # weak keywords, only for the next expected intent
+    match:   object = None    # custom predicate(Message) → bool, instead of words
+    reply:   object = None    # text to send, or fn(msg) → text | None (may be async)
+    note:    str = ""         # status line shown when answering
+    timeout: float = 40
+    after:   tuple = ()       # intents that must be answered first
+    until:   tuple = ()       # intent closes once any of these is answered
+    final:   bool = False     # dialog ends on this message (returned)
+    fail:    str = ""         # matching this raises DialogError(fail)
+    blind:   bool = False     # on timeout, answer anyway instead of failing
+    missing: str = ""         # error text when it times out
+    legacy:  float = 0        # fixed delay the old sequential flow spent here
+
+    def score(self, m: Message) -> int:
+        if self.match:
+            try:
+                return 1 if self.match(m) else 0
+            except Exception:
+                return 0
+        return sum(1 for w in self.words if w in _prompt(m))
+
+    def loosely(self, m: Message) -> bool:
+        text = _prompt(m)
+        return bool(text) and any(w in text for w in self.loose)
+
+
+def _prompt(m: Message) -> str:
+    # prompts are text messages; a file's caption ("Lecture 1 @credit")
+    # must not answer one, it is left for the monitor
+    return "" if m.media else (m.text or "").lower()
+
+
+class Dialog:
+    def __init__(self, chat: str, intents: list[Intent], tag: str = "dlg", status_cb=None):
+        self.chat    = chat
+        self.intents = intents
+        self.tag     = tag
+        self.st      = status_cb
+        self.done: set[str] = set()
+        self.sent: dict[str, int] = {}     # intent → id of the message we answered it with
+        self.last_id = 0
+
+    def _open(self) -> list[Intent]:
+        return [
+            i for i in self.intents
+            if i.name not in self.done
+            and all(a in self.done for a in i.after)
+            and not any(u in self.done for u in i.until)
+        ]
+
+    def _expected(self) -> Intent | None:
+        return next((i for i in self._open() if not i.fail), None)
+
+    def _classify(self, m: Message) -> list[Intent]:
+        """Open intents this message answers, best match first."""
+        opened = self._open()
+        fails  = [i for i in opened if i.fail and i.score(m)]
+        if fails:
+            return fails[:1]
+        hits = [(i.score(m), n, i) for n, i in enumerate(opened) if not i.fail]
+        hits = [h for h in hits if h[0]]
+        if hits:
+            return [i for _, _, i in sorted(hits, key=lambda h: (-h[0], h[1]))]
+        exp = self._expected()
+        return [exp] if exp and exp.loose and exp.loosely(m) else []
+
+    async def _answer(self, i: Intent, m: Message | None, since):
+        if i.note and self.st:
+            await self.st(i.note)
+        r = i.reply(m) if callable(i.reply) else i.reply
+        if inspect.isawaitable(r):
+            r = await r
+        if isinstance(r, str):
+            r = await ub_send(self.chat, r)
+        if isinstance(r, Message):
+            self.sent[i.name] = r.id
+            self.last_id = max(self.last_id, r.id)
+        self.done.add(i.name)
+        metrics.record(f"{self.tag}:{i.name}", since, i.legacy)
+
+    async def run(self, after_id: int) -> Message | None:
+        """
+        Answer prompts until every intent is done or a final one matches.
+        Returns the final message (None if the dialog has no final intent).
+        """
+        self.last_id = after_id
+        cursor = after_id          # last peer message consumed
+        carry: list[Intent] = []   # other intents a merged prompt asked for
+        since = metrics.mark()
+
+        while (exp := self._expected()) is not None:
+            timeout = MERGE_GRACE if carry else exp.timeout
+            m = await ub_wait_reply(
+                self.chat, cursor, timeout=timeout,
+                check=lambda m: bool(self._classify(m))
+            )
+
+            if m is None:
+                if carry:
+                    i = carry.pop(0)
+                    if i in self._open():
+                        print(f"[{self.tag}] merged prompt → answering {i.name}")
+                        await self._answer(i, None, since)
+                        since = metrics.mark()
+                    continue
+                if exp.blind:
+                    print(f"[{self.tag}] no '{exp.name}' prompt — answering anyway")
+                    await self._answer(exp, None, since)
+                    since = metrics.mark()
+                    continue
+                raise DialogError(exp.missing or f"No '{exp.name}' prompt — timeout")
+
+            cursor = m.id
+            self.last_id = max(self.last_id, m.id)
+            hits  = self._classify(m)
+            first = hits[0]
+            if first.fail:
+                raise DialogError(first.fail)
+            if first.final:
+                self.done.add(first.name)
+                metrics.record(f"{self.tag}:{first.name}", since, first.legacy)
+                return m
+            await self._answer(first, m, since)
+            since = metrics.mark()
+            carry = [i for i in hits[1:] if not i.final]
+
+        return None
@@ -2,120 +2,181 @@
 core/extractor.py  —  Phase 1
 Talks to @pwextract_bot to get the .txt file.
 
-Steps:
+Steps (declared as dialog intents, see core/dialog.py):
   /start → click PW button → send token →
   wait batch list → send batch number →
   wait choice prompt → send "2" →
-  wait txt file → download → return local path
+  wait txt file → return a TxtRef to it
+
+Nothing is downloaded: the uploader gets the .txt straight from the
+extractor chat (see core/uploader.py).
+
+extract_batches() pulls several batches from one login: after the
+first .txt it goes straight to "send batch number" for the next one.
 """
 
-import asyncio
 import re
-from core.userbot import (
-    ub_send, ub_last_id, ub_wait_reply,
-    ub_wait_file, ub_download, ub_click_btn
-)
+from contextlib import aclosing, AsyncExitStack
+from dataclasses import dataclass, asdict
+from core.userbot import ub_send, ub_click_btn
+from core.dialog import Dialog, Intent, DialogError
+from core import scheduler, txtcache
 from config import PW_BUTTON_TEXT, WAIT_CHOICE
 
+TOKEN_ERRORS = ["expired", "invalid", "wrong token", "error"]
+REUSE_WAIT   = 20    # secs for the choice prompt before assuming the session is gone
+
 
 class ExtractorError(Exception):
     pass
 
 
+@dataclass
+class TxtRef:
+    """The extractor's .txt on Telegram — the message it came in and its file."""
+    chat:      str      # extractor bot
+    msg_id:    int
+    file_id:   str
+    file_name: str
+
+
 async def run_extractor(
     bot_un: str,
     token: str,
     batch_name: str,
     cb=None          # async status callback
-) -> str:
-    """Returns local .txt file path. Raises ExtractorError on failure."""
+) -> TxtRef:
+    """Returns the .txt reference. Raises ExtractorError on failure."""
+    async with aclosing(extract_batches(bot_un, token, [batch_name], cb)) as batches:
+        async for _, ref in batches:
+            return ref
+
+
+async def extract_batches(bot_un: str, token: str, batch_names: list, cb=None):
+    """
+    Yields (batch_name, TxtRef) for each batch, in order, from
+    one conversation: the first batch logs in and reads the batch list,
+    later ones just send their number from that list. If the bot has
+    dropped the session, that batch falls back to a fresh login.
+    Batches in the .txt cache (core/txtcache.py) skip the bot entirely.
+    Raises ExtractorError on failure.
+    """
 
     async def st(msg):
         print(f"[EXT] {msg}")
         if cb: await cb(msg)
 
-    # ── 1. /start ──
+    async def queued(ahead):
+        await st(f"🕒 Waiting for {bot_un} — {ahead} job(s) ahead")
+
+    listing = None
+
+    async with AsyncExitStack() as stack:
+        leased = False
+        for n, batch_name in enumerate(batch_names, 1):
+            if len(batch_names) > 1:
+                await st(f"📦 Extracting batch {n}/{len(batch_names)}: {batch_name}")
+            cached = txtcache.get(bot_un, batch_name, WAIT_CHOICE)
+            if cached:
+                await st("♻️ Same batch extracted today — using that txt")
+                yield batch_name, TxtRef(**cached)
+                continue
+
+            # one conversation per bot chat at a time — see core/scheduler.py
+            if not leased:
+                await stack.enter_async_context(
+                    scheduler.lease(bot_un, batch_name, "ext:queue", queued))
+                leased = True
+            txt_msg = await _reuse(bot_un, listing, batch_name, st) if listing else None
+            if txt_msg is None:
+                txt_msg, listing = await _login(bot_un, token, batch_name, st)
+
+            ref = TxtRef(bot_un, txt_msg.id, txt_msg.document.file_id,
+                         txt_msg.document.file_name or "batch.txt")
+            txtcache.put(bot_un, batch_name, WAIT_CHOICE, asdict(ref))
+            await st(f"✅ Got {ref.file_name}")
+            yield batch_name, ref
+
+
+async def _login(bot_un: str, token: str, batch_name: str, st):
+    """Full flow for one batch; returns (txt message, batch list text)."""
+    listing = None
+
+    async def click_pw(m):
+        if not (m and await ub_click_btn(m, PW_BUTTON_TEXT)):
+            return PW_BUTTON_TEXT
+
+    async def pick_batch(m):
+        nonlocal listing
+        listing = m.text or ""
+        return await _pick(listing, batch_name, st)
+
+    dialog = Dialog(bot_un, [
+        Intent("start", timeout=25, legacy=4,
+               match=lambda m: m.reply_markup is not None or (m.text and len(m.text) > 10),
+               reply=click_pw, note=f"🔘 Clicking '{PW_BUTTON_TEXT}' button",
+               missing="Extractor bot didn't respond to /start"),
+        Intent("token", words=("token",), loose=("send", "enter"),
+               after=("start",), timeout=20, blind=True, legacy=5,
+               reply=token, note="🔑 Sending PW token..."),
+        Intent("expired", words=("expired", "invalid", "wrong token"),
+               after=("token",), until=("batches",), fail="TOKEN_EXPIRED"),
+        Intent("batches", match=_is_batch_list, after=("token",),
+               timeout=150, legacy=3, reply=pick_batch,
+               missing="Batch list not received — timeout"),
+        *_choice_and_txt(after=("batches",)),
+    ], tag="ext", status_cb=st)
+
+    # ── /start → button → token → batch → choice → .txt ──
     await st("📡 /start → @pwextract_bot")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, "/start", delay=4)
-
-    start_msg = await ub_wait_reply(
-        bot_un, lid, timeout=25,
-        check=lambda m: m.reply_markup is not None or (m.text and len(m.text) > 10)
-    )
-    if not start_msg:
-        raise ExtractorError("Extractor bot didn't respond to /start")
-
-    # ── 2. Click PW button ──
-    await st(f"🔘 Clicking '{PW_BUTTON_TEXT}' button")
-    lid = start_msg.id
-    clicked = await ub_click_btn(start_msg, PW_BUTTON_TEXT)
-    if not clicked:
-        await ub_send(bot_un, PW_BUTTON_TEXT, delay=3)
-
-    # ── 3. Send token ──
-    # Wait for token prompt
-    token_prompt = await ub_wait_reply(
-        bot_un, lid, timeout=20,
-        check=lambda m: m.text and any(w in m.text.lower() for w in ["token", "send", "enter"])
-    )
-    await st("🔑 Sending PW token...")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, token, delay=3)
-
-    # ── 4. Wait for batch list (~2 min) ──
-    await st("⏳ Waiting for batch list (up to 2 min)...")
-    batch_msg = await ub_wait_reply(
-        bot_un, lid, timeout=150,
-        check=lambda m: m.text and any(
-            c.isdigit() for c in (m.text or "")
-        ) and ("." in (m.text or "") or "\n" in (m.text or ""))
-    )
-
-    if not batch_msg:
-        raise ExtractorError("Batch list not received — timeout")
-
-    # Check token error
-    txt = batch_msg.text or ""
-    if any(w in txt.lower() for w in ["expired", "invalid", "wrong token", "error"]):
-        raise ExtractorError("TOKEN_EXPIRED")
+    lid = (await ub_send(bot_un, "/start")).id
+    try:
+        return await dialog.run(lid), listing
+    except DialogError as e:
+        raise ExtractorError(str(e))
+
+
+async def _reuse(bot_un: str, listing: str, batch_name: str, st):
+    """Next batch in a logged-in session: number → choice → .txt (None if the session is gone)."""
+    dialog = Dialog(bot_un, _choice_and_txt(timeout=REUSE_WAIT, blind=False), tag="ext", status_cb=st)
+    lid = (await ub_send(bot_un, await _pick(listing, batch_name, st))).id
+    try:
+        return await dialog.run(lid)
+    except DialogError as e:
+        if "choice" in dialog.done:
+            raise ExtractorError(str(e))
+    await st("🔁 Session expired — logging in again")
+    return None
 
-    # ── 5. Find & send batch number ──
+
+def _choice_and_txt(after: tuple = (), timeout: float = 75, blind: bool = True) -> list[Intent]:
+    return [
+        Intent("choice", words=("choose", "select", "option"),
+               loose=("1.", "2.", "type", "send"),
+               after=after, timeout=timeout, blind=blind, legacy=4,
+               reply=WAIT_CHOICE, note=f"✅ Sending choice '{WAIT_CHOICE}' (Today's Class)"),
+        Intent("txt", match=lambda m: bool(
+                   m.document and (m.document.file_name or "").endswith(".txt")),
+               after=("choice",), timeout=250, final=True, legacy=5,
+               missing="txt file not received — timeout"),
+    ]
+
+
+async def _pick(listing: str, batch_name: str, st) -> str:
     await st(f"🔍 Finding batch number for: {batch_name}")
-    num = _find_number(txt, batch_name)
+    if any(w in listing.lower() for w in TOKEN_ERRORS):
+        raise ExtractorError("TOKEN_EXPIRED")
+    num = _find_number(listing, batch_name)
     if not num:
         raise ExtractorError(
-            f"Batch '{batch_name}' not found.\n\nAvailable:\n{txt[:400]}"
+            f"Batch '{batch_name}' not found.\n\nAvailable:\n{listing[:400]}"
         )
     await st(f"📋 Sending batch number: {num}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, num, delay=4)
-
-    # ── 6. Wait for choice prompt (~1 min) → send "2" ──
-    await st("⏳ Waiting for choice prompt (~1 min)...")
-    await ub_wait_reply(
-        bot_un, lid, timeout=75,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["choose", "select", "1.", "2.", "option", "type", "send"]
-        )
-    )
-    await st(f"✅ Sending choice '{WAIT_CHOICE}' (Today's Class)")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, WAIT_CHOICE, delay=5)
-
-    # ── 7. Wait for .txt file (2-3 min) ──
-    await st("⏳ Waiting for .txt file (up to 3 min)...")
-    txt_msg = await ub_wait_file(bot_un, lid, ext=".txt", timeout=250)
-    if not txt_msg:
-        raise ExtractorError("txt file not received — timeout")
-
-    # ── 8. Download ──
-    await st("💾 Downloading txt file...")
-    safe_name = re.sub(r"[^\w]", "_", batch_name[:25])
-    path = f"/tmp/ext_{safe_name}.txt"
-    local = await ub_download(txt_msg, path)
-    await st(f"✅ Saved: {local}")
-    return local
+    return num
+
+
+def _is_batch_list(m) -> bool:
+    return bool(m.text and re.search(r"^\s*\d+\s*[.):]", m.text, re.M))
 
 
 # ── Batch number finder ──
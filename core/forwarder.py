@@ -0,0 +1,223 @@
+"""
+core/forwarder.py
+Pipelined copying of uploader output to target channels.
+
+Detection (the monitor) put()s each qualifying message once; every
+destination has its own bounded queue and copy worker, so channels are
+drained independently and in source order. A slow or broken channel
+never holds up the others — only a full queue pushes back on detection.
+Pacing and FloodWait retries live in core/ratelimit.py.
+
+A worker takes everything queued for its channel at once (up to
+FWD_BATCH_MAX) and sends each run of plain messages in one bulk forward
+without the forward header; an album is copied as an album in one
+call. If a bulk call fails, that run is retried one message at a time,
+and so is every message of a bulk forward that did not arrive (matched
+by random_id), so failures are still reported per message.
+
+`marks` is the id of the last message each channel has handled (copied
+or given up on); a resumed job passes its checkpointed marks so nothing
+a channel already got is copied again.
+
+With a `job_id`, every copy is recorded in media_deliveries, and a file
+(by file_unique_id) that a channel already received — from this job or
+an earlier one — is skipped instead of being posted again, and recorded
+for this job too (the channel has it). The check runs against an
+in-memory set per channel, loaded once per job.
+"""
+
+import asyncio
+from pyrogram.errors import (
+    ChatWriteForbidden, ChatAdminRequired, ChannelPrivate, PeerIdInvalid
+)
+from core.userbot import ub_copy, ub_forward, ub_album, ub_copy_album
+from db import aio
+from config import FWD_QUEUE_MAX, FWD_BATCH_MAX
+
+# Errors after which a destination is given up for the rest of the job
+FATAL = (ChatWriteForbidden, ChatAdminRequired, ChannelPrivate, PeerIdInvalid)
+
+
+class Forwarder:
+    def __init__(self, src_chat: str, channels: list, marks: dict = None, job_id: int = None):
+        self.src    = src_chat
+        self.job_id = job_id
+        self.stats  = {ch: {"copied": 0, "failed": 0, "skipped": 0, "dead": None} for ch in channels}
+        self.marks  = {ch: (marks or {}).get(ch, 0) for ch in channels}
+        self.queues = {ch: asyncio.Queue(FWD_QUEUE_MAX) for ch in channels}
+        self.albums = {ch: set() for ch in channels}     # media groups copied whole
+        self.have   = {ch: set() for ch in channels}     # file_unique_ids already in the channel
+        self._groups: dict[str, list] = {}               # media_group_id → member messages
+        loop = asyncio.get_running_loop()
+        self._loaded = loop.create_task(self._load()) if job_id else None
+        self.workers = [
+            asyncio.get_running_loop().create_task(self._worker(ch, q))
+            for ch, q in self.queues.items()
+        ]
+
+    async def put(self, m):
+        """Queue one message for every destination (blocks when a queue is full)."""
+        for ch, q in self.queues.items():
+            if m.id > self.marks[ch]:
+                await q.put(m)
+
+    async def close(self, drain: bool = True) -> dict:
+        """Wait until every queue is drained (unless not `drain`), stop the workers, return stats."""
+        if drain:
+            for q in self.queues.values():
+                await q.join()
+        for w in self.workers:
+            w.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        return self.stats
+
+    async def _load(self):
+        try:
+            for ch, ids in (await aio.get_media_delivered(list(self.have))).items():
+                self.have[ch] |= ids
+        except Exception as e:
+            print(f"[FWD] can't load delivered media ({e}) — no duplicate check against earlier jobs")
+
+    def _record(self, ch, msgs: list):
+        self.have[ch].update(file_uid(m) for m in msgs)
+        if self.job_id and msgs:
+            # ordered behind earlier writes on the DB thread, not awaited
+            aio.submit(aio.add_media_deliveries, [
+                (self.src, m.id, file_uid(m), _kind(m), _media(m).file_size, ch, self.job_id)
+                for m in msgs
+            ])
+
+    async def _worker(self, ch, q: asyncio.Queue):
+        while True:
+            batch = [await q.get()]
+            while len(batch) < FWD_BATCH_MAX and not q.empty():
+                batch.append(q.get_nowait())
+            try:
+                for run in _runs(batch):
+                    try:
+                        await self._send(ch, run)
+                    except Exception as e:
+                        # the worker must live on: close() waits for the queue to drain
+                        self.stats[ch]["failed"] += len(run)
+                        self.marks[ch] = max(self.marks[ch], run[-1].id)
+                        print(f"[FWD] {ch} msgs {run[0].id}..{run[-1].id}: {e!r}")
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+    async def _send(self, ch, run: list):
+        st   = self.stats[ch]
+        msgs = [m for m in run if m.id > self.marks[ch]]      # album copies mark ahead
+        if not msgs:
+            return
+        if self._loaded:
+            await self._loaded
+        fresh, there, uids = [], [], set(self.have[ch])
+        for m in msgs:
+            if file_uid(m) in uids:
+                there.append(m)
+            else:
+                fresh.append(m)
+                uids.add(file_uid(m))
+        st["skipped"] += len(there)
+        self._record(ch, there)
+        if not fresh or st["dead"]:
+            st["failed"] += len(fresh)
+            self.marks[ch] = msgs[-1].id
+            return
+        try:
+            gid   = run[0].media_group_id
+            group = await self._whole_album(ch, gid, fresh[0].id) if gid else None
+            if group:
+                n = await ub_copy_album(self.src, group[0].id, ch)
+                self.albums[ch].add(gid)
+                fresh = group
+            else:
+                ids = set(await ub_forward(self.src, [m.id for m in fresh], ch))
+        except FATAL as e:
+            st["failed"] += len(fresh)
+            st["dead"] = type(e).__name__
+            print(f"[FWD] {ch}: giving up — {e}")
+        except Exception as e:
+            if len(fresh) > 1:
+                print(f"[FWD] {ch} msgs {fresh[0].id}..{fresh[-1].id}: {e} — retrying one by one")
+                for m in fresh:
+                    await self._copy_one(ch, m)
+                self.marks[ch] = max(self.marks[ch], msgs[-1].id)
+                return
+            st["failed"] += 1
+            print(f"[FWD] {ch} msg {fresh[0].id}: {e}")
+        else:
+            if group:
+                # the copies don't say which member they came from: all or nothing is recorded
+                st["copied"] += min(n, len(fresh))
+                if n < len(fresh):
+                    st["failed"] += len(fresh) - n
+                    print(f"[FWD] {ch} album {gid}: only {n} of {len(fresh)} arrived")
+                else:
+                    self._record(ch, fresh)
+            else:
+                sent = [m for m in fresh if m.id in ids]
+                st["copied"] += len(sent)
+                self._record(ch, sent)
+                if len(sent) < len(fresh):
+                    print(f"[FWD] {ch} msgs {fresh[0].id}..{fresh[-1].id}: "
+                          f"{len(fresh) - len(sent)} didn't arrive — retrying them one by one")
+                    for m in fresh:
+                        if m.id not in ids:
+                            await self._copy_one(ch, m)
+        # not reached when cancelled — an interrupted send is redone on resume
+        self.marks[ch] = max(self.marks[ch], msgs[-1].id, fresh[-1].id)
+
+    async def _whole_album(self, ch, gid: str, first: int) -> list | None:
+        """The album's messages if it can be copied whole into `ch` (none of it there yet)."""
+        if gid in self.albums[ch]:
+            return None
+        if gid not in self._groups:
+            self._groups[gid] = sorted(await ub_album(self.src, first), key=lambda m: m.id)
+        group = self._groups[gid]
+        if group and group[0].id > self.marks[ch] and not any(file_uid(m) in self.have[ch] for m in group):
+            return group
+        return None
+
+    async def _copy_one(self, ch, m):
+        st = self.stats[ch]
+        try:
+            if st["dead"]:
+                st["failed"] += 1
+            else:
+                await ub_copy(self.src, m.id, ch)
+                st["copied"] += 1
+                self._record(ch, [m])
+        except FATAL as e:
+            st["failed"] += 1
+            st["dead"] = type(e).__name__
+            print(f"[FWD] {ch}: giving up — {e}")
+        except Exception as e:
+            st["failed"] += 1
+            print(f"[FWD] {ch} msg {m.id}: {e}")
+        self.marks[ch] = m.id
+
+
+def _runs(batch: list) -> list[list]:
+    """Split queued messages, in order, into runs of plain messages and single albums."""
+    runs = []
+    for m in batch:
+        if runs and runs[-1][-1].media_group_id == m.media_group_id:
+            runs[-1].append(m)
+        else:
+            runs.append([m])
+    return runs
+
+
+def _media(m):
+    return m.video or m.document or m.photo
+
+
+def _kind(m) -> str:
+    return "video" if m.video else "pdf" if m.document else "other"
+
+
+def file_uid(m) -> str:
+    """The file_unique_id of a message's video, document or photo."""
+    return _media(m).file_unique_id
@@ -0,0 +1,101 @@
+"""
+core/jobqueue.py
+Worker pool over the durable job queue (jobs table, db/database.py).
+
+A worker claims the oldest queued job under a lease and keeps renewing
+it while the job runs. A lease that runs out (crash, redeploy) puts the
+job back in the queue, so no job is dropped on restart — it is retried
+up to JOB_MAX_ATTEMPTS times. At most JOB_WORKERS jobs run at once.
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from db.aio import claim_job, renew_lease, requeue_stale, release_jobs, finish_job
+from config import JOB_WORKERS, JOB_LEASE, JOB_POLL, JOB_MAX_ATTEMPTS
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_wake:  asyncio.Event | None = None
+_tasks: list[asyncio.Task] = []
+_busy:  set[int] = set()              # ids of jobs running in this process
+
+
+async def start(run, workers: int = JOB_WORKERS):
+    """Recover stale jobs and start the pool; `await run(job)` executes one job row."""
+    global _wake
+    _wake = asyncio.Event()
+    n = await requeue_stale(JOB_MAX_ATTEMPTS)
+    if n:
+        print(f"[Jobs] ♻️ Recovered {n} interrupted job(s)")
+    loop = asyncio.get_running_loop()
+    _tasks[:] = [loop.create_task(_worker(run, i)) for i in range(workers)]
+    _tasks.append(loop.create_task(_janitor()))
+    print(f"[Jobs] ✅ {workers} worker(s) as {OWNER}")
+
+
+def wake():
+    """A job was queued — let an idle worker pick it up now."""
+    if _wake:
+        _wake.set()
+
+
+def busy() -> set[int]:
+    return set(_busy)
+
+
+async def stop():
+    """Stop the pool; jobs still running go back to the queue."""
+    for t in _tasks:
+        t.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    n = await release_jobs(OWNER)
+    if n:
+        print(f"[Jobs] Released {n} running job(s) for the next instance")
+
+
+async def _worker(run, n: int):
+    while True:
+        _wake.clear()
+        job = await claim_job(OWNER, JOB_LEASE)
+        if not job:
+            try:
+                await asyncio.wait_for(_wake.wait(), JOB_POLL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        print(f"[Jobs] worker {n} → job {job['id']} (attempt {job['attempts']})")
+        _busy.add(job["id"])
+        task = asyncio.get_running_loop().create_task(run(job))
+        beat = asyncio.get_running_loop().create_task(_heartbeat(job["id"], task))
+        try:
+            await task
+        except asyncio.CancelledError:
+            if not task.cancelled() or asyncio.current_task().cancelling():
+                raise
+            print(f"[Jobs] job {job['id']} lost its lease — stopped")
+        except Exception as e:
+            await finish_job(job["id"], "failed", error=str(e))
+            print(f"[Jobs] job {job['id']} crashed: {e}")
+        finally:
+            beat.cancel()
+            _busy.discard(job["id"])
+
+
+async def _heartbeat(job_id: int, task: asyncio.Task):
+    while True:
+        await asyncio.sleep(JOB_LEASE / 3)
+        if not await renew_lease(job_id, OWNER, JOB_LEASE):
+            task.cancel()
+            return
+
+
+async def _janitor():
+    # Leases of another (dead) instance expire while we are running
+    while True:
+        await asyncio.sleep(JOB_LEASE)
+        if await requeue_stale(JOB_MAX_ATTEMPTS):
+            wake()
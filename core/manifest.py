@@ -0,0 +1,89 @@
+"""
+core/manifest.py
+The extractor's .txt read as a manifest — one `Title:URL` line per item.
+
+The uploader posts one video per video link and one document per .pdf
+link, so counting the lines tells a job how many files to expect: the
+status view gets a percentage and ETA, and the monitor can stop as soon
+as the last one is forwarded (see core/uploader.py). The file is read
+line by line, never held in memory whole.
+
+Each item has a stable key (title + link without its query string) so
+a repeat run can leave out what was already delivered: filter_new()
+writes a copy of the .txt without those items.
+"""
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from core.userbot import ub_download
+from core import metrics
+
+LINE      = re.compile(r"^\s*(?P<title>.*?)\s*:\s*(?P<url>https?://\S+)\s*$")
+IMAGE_EXT = (".jpg", ".jpeg", ".png", ".webp", ".gif")   # not posted as files
+
+
+@dataclass
+class Entry:
+    title: str
+    url:   str
+    kind:  str      # "video" | "pdf" | "other"
+
+    @property
+    def key(self) -> str:
+        # signed links change between extractions; host + path do not
+        u = urlsplit(self.url)
+        return hashlib.sha1(f"{self.title.lower()}|{u.netloc}{u.path}".encode()).hexdigest()[:20]
+
+
+def _entry(line: str) -> Entry | None:
+    m = LINE.match(line)
+    if not m:
+        return None
+    path = urlsplit(m["url"]).path.lower()
+    kind = "pdf" if path.endswith(".pdf") else "other" if path.endswith(IMAGE_EXT) else "video"
+    return Entry(m["title"], m["url"], kind)
+
+
+def parse(lines):
+    """Yield an Entry per item line; anything else (headers, blanks) is skipped."""
+    for line in lines:
+        e = _entry(line)
+        if e:
+            yield e
+
+
+def filter_new(src: str, dst: str, delivered: set, start: int = 1) -> tuple[list, int]:
+    """
+    Copy the .txt at `src` to `dst` leaving out items whose key is in
+    `delivered` (items before `start` are kept: the uploader skips them).
+    Returns (the items kept from `start` on, how many were left out).
+    """
+    kept, dropped, n = [], 0, 0
+    with open(src, encoding="utf-8", errors="replace") as f, open(dst, "w", encoding="utf-8") as out:
+        for line in f:
+            e = _entry(line)
+            if e:
+                n += 1
+                if n >= start:
+                    if e.key in delivered:
+                        dropped += 1
+                        continue
+                    kept.append(e)
+            out.write(line)
+    return kept, dropped
+
+
+def files(entries: list) -> int:
+    """How many files the uploader posts for `entries`."""
+    return sum(e.kind != "other" for e in entries)
+
+
+async def fetch(txt, workdir: str) -> str:
+    """Download the .txt (a core.extractor.TxtRef) into `workdir`; returns the path."""
+    since = metrics.mark()
+    path  = await ub_download(txt.file_id, os.path.join(workdir, txt.file_name))
+    metrics.record("upl:manifest", since)
+    return path
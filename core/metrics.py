@@ -0,0 +1,93 @@
+"""
+core/metrics.py
+Per-job timing counters.
+
+A job opens a scope with job_metrics(); every helper it awaits
+(ub_* calls, dialog steps, monitor sleeps) records into that scope
+through a context variable, so nothing is threaded through arguments.
+Times come from the event loop clock.
+"""
+
+import asyncio
+import contextvars
+
+
+def _now() -> float:
+    return asyncio.get_running_loop().time()
+
+
+class JobMetrics:
+    def __init__(self):
+        self.started = _now()
+        self.slept   = 0.0     # dead time: pacing gaps, monitor ticks
+        self.waited  = 0.0     # blocked on a peer bot's reply
+        self.steps: list[dict] = []
+
+    def summary(self) -> dict:
+        legacy = sum(s["legacy"] for s in self.steps)
+        slept  = sum(s["slept"] for s in self.steps if s["legacy"])
+        return {
+            "wall":   round(_now() - self.started, 2),
+            "steps":  len(self.steps),
+            "slept":  round(self.slept, 2),
+            "waited": round(self.waited, 2),
+            "legacy": round(legacy, 2),
+            "saved":  round(legacy - slept, 2),
+        }
+
+
+_current: contextvars.ContextVar[JobMetrics | None] = contextvars.ContextVar(
+    "job_metrics", default=None
+)
+
+
+def job_metrics() -> JobMetrics:
+    """Start a fresh scope for the current task (and tasks it spawns)."""
+    m = JobMetrics()
+    _current.set(m)
+    return m
+
+
+def current() -> JobMetrics | None:
+    return _current.get()
+
+
+def add_sleep(secs: float):
+    m = _current.get()
+    if m:
+        m.slept += secs
+
+
+def add_wait(secs: float):
+    m = _current.get()
+    if m:
+        m.waited += secs
+
+
+async def sleep(secs: float):
+    """asyncio.sleep that counts as dead time."""
+    add_sleep(secs)
+    await asyncio.sleep(secs)
+
+
+def mark() -> tuple[float, float, float]:
+    """Snapshot (time, slept, waited) to measure a step from."""
+    m = _current.get()
+    return _now(), (m.slept if m else 0.0), (m.waited if m else 0.0)
+
+
+def record(name: str, since: tuple, legacy: float = 0.0):
+    """
+    Record one step started at `since` (see mark()): its wall time,
+    dead time and peer-wait time inside it, and the fixed delay the old
+    sequential flow spent on it (`legacy`).
+    """
+    m = _current.get()
+    if m:
+        m.steps.append({
+            "name":   name,
+            "secs":   _now() - since[0],
+            "slept":  m.slept - since[1],
+            "waited": m.waited - since[2],
+            "legacy": legacy,
+        })
@@ -0,0 +1,146 @@
+"""
+core/ratelimit.py
+One shared limiter around the Telegram API calls jobs make: every
+userbot call (a paged history walk takes a token per page) and the
+bot's broadcasts and status edits. Handler replies to a user's own
+command or button tap (reply, answer, editing that menu) are not
+limited — one per update, they are paced by the user.
+
+Calls are grouped into method classes, each with a token bucket, and
+optionally a per-chat bucket on top (e.g. copies into one channel).
+A FloodWait pauses the class for the wait Telegram asked for and the
+call is retried, so we go as fast as the server allows and no faster.
+snapshot() exposes the state for /stats and benchmarks.
+"""
+
+import asyncio
+from pyrogram.errors import FloodWait
+from core import metrics
+from config import (
+    UB_MIN_GAP, FWD_CHANNEL_GAP, FWD_MAX_PER_SEC,
+    RL_READ, RL_BOT_SEND, RL_BOT_EDIT, FLOOD_MAX_WAIT, FLOOD_RETRIES
+)
+
+
+class Bucket:
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate   = rate        # tokens per second
+        self.burst  = burst
+        self.tokens = burst
+        self.stamp  = None
+        self.paused_until = 0.0
+        self.calls  = 0
+        self.floods = 0
+        self.flood_secs = 0.0
+
+    def _refill(self, now: float):
+        if self.stamp is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 → now)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+        self.calls  += 1
+
+    def pause(self, now: float, secs: float):
+        self.floods += 1
+        self.flood_secs += secs
+        self.paused_until = max(self.paused_until, now + secs)
+
+
+# class → (rate/s, burst); per-chat buckets → seconds between calls
+CLASSES = {
+    "send":     (5, 5),                        # userbot → peer bots
+    "copy":     (FWD_MAX_PER_SEC, FWD_MAX_PER_SEC),
+    "read":     (RL_READ, RL_READ),            # history, get_messages, get_chat
+    "download": (2, 2),
+    "bot":      (RL_BOT_SEND, RL_BOT_SEND),    # bot → users
+    "edit":     (RL_BOT_EDIT, RL_BOT_EDIT),    # bot status-message edits
+}
+PER_CHAT = {
+    "send": UB_MIN_GAP,
+    "copy": FWD_CHANNEL_GAP,
+    "bot":  1.0,
+    "edit": 1.0,
+}
+
+CHATS_MAX = 5000     # per-chat buckets kept before idle ones are dropped
+
+_classes: dict[str, Bucket] = {k: Bucket(*v) for k, v in CLASSES.items()}
+_chats:   dict[tuple, Bucket] = {}
+
+
+def _prune(now: float):
+    for k, b in list(_chats.items()):
+        if b.delay(now) == 0 and b.tokens >= b.burst:
+            del _chats[k]
+
+
+def _buckets(kind: str, key) -> list[Bucket]:
+    out = [_classes[kind]]
+    if key is not None and kind in PER_CHAT:
+        b = _chats.get((kind, key))
+        if b is None:
+            if len(_chats) >= CHATS_MAX:
+                _prune(asyncio.get_running_loop().time())
+            b = _chats[(kind, key)] = Bucket(1 / PER_CHAT[kind])
+        out.append(b)
+    return out
+
+
+async def call(kind: str, fn, *args, key=None, wait: bool = True, **kwargs):
+    """
+    Run `await fn(*args, **kwargs)` under the `kind` limits.
+    key  — chat the call targets (adds its per-chat bucket)
+    wait — False: skip the call (return None) instead of waiting for a
+           token or retrying a FloodWait; for droppable calls like edits.
+    """
+    loop = asyncio.get_running_loop()
+    buckets = _buckets(kind, key)
+    for attempt in range(FLOOD_RETRIES + 1):
+        while (d := max(b.delay(loop.time()) for b in buckets)) > 0:
+            if not wait:
+                return None
+            await metrics.sleep(d)
+        for b in buckets:
+            b.take()
+        try:
+            return await fn(*args, **kwargs)
+        except FloodWait as e:
+            secs = float(e.value or 1)
+            for b in buckets:
+                b.pause(loop.time(), secs)
+            if not wait or attempt == FLOOD_RETRIES or secs > FLOOD_MAX_WAIT:
+                raise
+            print(f"[RateLimit] FloodWait {secs:.0f}s on {kind} ({key}) — retrying")
+
+
+def reset():
+    """Forget all bucket state (a fresh event loop has a fresh clock)."""
+    _classes.update({k: Bucket(*v) for k, v in CLASSES.items()})
+    _chats.clear()
+
+
+def snapshot() -> dict:
+    loop = asyncio.get_event_loop()
+    now  = loop.time()
+    out  = {}
+    for kind, b in _classes.items():
+        b._refill(now)
+        out[kind] = {
+            "rate":       b.rate,
+            "tokens":     round(b.tokens, 2),
+            "calls":      b.calls,
+            "floods":     b.floods + sum(c.floods for (k, _), c in _chats.items() if k == kind),
+            "flood_secs": round(b.flood_secs, 1),
+            "paused_for": round(max(0.0, b.paused_until - now), 1),
+            "chats":      sum(1 for (k, _) in _chats if k == kind),
+        }
+    return out
@@ -0,0 +1,93 @@
+"""
+core/scheduler.py
+Exclusive conversation leases per peer-bot chat.
+
+Every job talks to the peer bots through the one userbot account, so two
+jobs in the same bot chat would interleave their /start, token and batch
+messages (and both monitors would see each other's files). A job holds
+the chat's lease for the whole conversation; other jobs queue for it in
+FIFO order, while jobs on different bots run side by side.
+"""
+
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from core import metrics
+
+
+class _Lane:
+    def __init__(self):
+        self.holder = None
+        self.queue: deque[list] = deque()     # [who, future, on_wait]
+
+
+_lanes: dict[str, _Lane] = {}
+
+
+def _key(chat) -> str:
+    return str(chat).lower().lstrip("@")
+
+
+@asynccontextmanager
+async def lease(chat, who: str = "", step: str = "queue", on_wait=None):
+    """
+    Hold the conversation with `chat` for the duration of the block.
+    While queued, `await on_wait(ahead)` is called whenever the number of
+    jobs ahead (holder included) changes; time spent queued is recorded
+    as metrics step `step`.
+    """
+    key  = _key(chat)
+    lane = _lanes.setdefault(key, _Lane())
+    if lane.holder is not None:
+        fut   = asyncio.get_running_loop().create_future()
+        entry = [who, fut, on_wait]
+        lane.queue.append(entry)
+        since = metrics.mark()
+        try:
+            if on_wait:
+                await on_wait(len(lane.queue))
+            await fut
+        except BaseException:
+            # cancelled, or on_wait failed: leave the queue (or pass the chat on)
+            if fut.done() and not fut.cancelled():
+                _release(key, lane)             # handed to us just as we left
+            else:
+                fut.cancel()                    # _release skips it if still queued
+                if entry in lane.queue:
+                    lane.queue.remove(entry)
+                    _notify(lane)
+            raise
+        metrics.record(step, since)
+    else:
+        lane.holder = who
+
+    try:
+        yield
+    finally:
+        _release(key, lane)
+
+
+def _release(key: str, lane: _Lane):
+    # pass the chat to the first waiter still waiting (a cancelled one may
+    # not have left the queue yet)
+    while lane.queue:
+        who, fut, _ = lane.queue.popleft()
+        if not fut.done():
+            lane.holder = who
+            fut.set_result(None)
+            _notify(lane)
+            return
+    lane.holder = None
+    _lanes.pop(key, None)
+
+
+def _notify(lane: _Lane):
+    loop = asyncio.get_running_loop()
+    for ahead, (_, _, on_wait) in enumerate(lane.queue, 1):
+        if on_wait:
+            loop.create_task(on_wait(ahead))
+
+
+def snapshot() -> dict:
+    """{bot: {"holder": who, "waiting": n}} for every busy peer-bot chat."""
+    return {k: {"holder": l.holder, "waiting": len(l.queue)} for k, l in _lanes.items()}
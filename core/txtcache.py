@@ -0,0 +1,64 @@
+"""
+core/txtcache.py
+Cache of extractor .txt results.
+
+An entry is addressed by what determines the file — extractor bot,
+batch, choice and the day (choice "2" is today's classes) — so a second
+job for the same batch skips Phase 1. Entries hold the Telegram
+reference to the .txt (see core.extractor.TxtRef), not its bytes: the
+uploader gets the file from Telegram either way. Entries expire after
+TXT_CACHE_TTL; beyond TXT_CACHE_MAX entries the oldest are evicted.
+Lives next to the database (DB_PATH's directory).
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from config import DB_PATH, TXT_CACHE_TTL, TXT_CACHE_MAX
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "txt_cache")
+
+
+def _path(bot_un: str, batch: str, choice: str) -> str:
+    key = "\n".join((bot_un.lower().lstrip("@"), batch.strip().lower(), choice,
+                     date.today().isoformat()))
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode()).hexdigest()[:32] + ".json")
+
+
+def get(bot_un: str, batch: str, choice: str) -> dict | None:
+    """The cached reference, or None on a miss."""
+    path = _path(bot_un, batch, choice)
+    try:
+        if time.time() - os.path.getmtime(path) > TXT_CACHE_TTL:
+            os.remove(path)
+            return None
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def put(bot_un: str, batch: str, choice: str, ref: dict):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    dst = _path(bot_un, batch, choice)
+    tmp = f"{dst}.{os.getpid()}.part"
+    with open(tmp, "w") as f:
+        json.dump(ref, f)
+    os.replace(tmp, dst)          # readers never see a half-written entry
+    _evict()
+
+
+def _evict():
+    now, files = time.time(), []
+    for e in os.scandir(CACHE_DIR):
+        if not e.name.endswith(".json"):
+            continue
+        mtime = e.stat().st_mtime
+        if now - mtime > TXT_CACHE_TTL:
+            os.remove(e.path)
+        else:
+            files.append((mtime, e.path))
+    for _, path in sorted(files)[:max(0, len(files) - TXT_CACHE_MAX)]:
+        os.remove(path)
@@ -1,16 +1,31 @@
 """
 core/uploader.py  —  Phase 2
 Talks to @Mahira_uploder_24bot, sends txt file,
-answers all prompts, then monitors & forwards
+answers all prompts (as dialog intents, in any order),
+then monitors & forwards
 videos + PDFs to target channels (no forward tag).
+
+The .txt is handed over by reference (core.extractor.TxtRef): copied
+from the extractor chat, else re-sent by file_id; only if both fail is
+it downloaded into the job's workdir and uploaded. A local path (a
+filtered copy, see core/manifest.py) is uploaded as is.
+
+The forwarding phase checkpoints itself through `checkpoint_cb`, and
+resume_uploader() picks a job up again from such a checkpoint.
 """
 
 import asyncio
-from pyrogram.types import Message
-from core.userbot import (
-    get_userbot, ub_send, ub_send_doc,
-    ub_last_id, ub_wait_reply, ub_copy
-)
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import aclosing
+from pyrogram.errors import RPCError
+from core.userbot import ub_send, ub_send_doc, ub_copy_doc, ub_download, ub_stream
+from core.forwarder import Forwarder
+from core.dialog import Dialog, Intent, DialogError
+from core import metrics, scheduler
+from db import aio
 from config import RESOLUTION, START_INDEX, THUMBNAIL
 
 DONE_WORDS = [
@@ -19,6 +34,10 @@ DONE_WORDS = [
     "process complete", "extraction done", "done!"
 ]
 
+MONITOR_TIMEOUT  = 2700   # 45 min max
+MONITOR_IDLE     = 900    # secs without a new file before giving up (when the total is known)
+CHECKPOINT_EVERY = 2      # secs between checkpoint saves while forwarding
+
 
 class UploaderError(Exception):
     pass
@@ -27,16 +46,25 @@ class UploaderError(Exception):
 async def run_uploader(
     bot_un: str,
     secret_cmd: str,
-    txt_path: str,
+    txt,                   # core.extractor.TxtRef, or a local .txt path
     batch_name: str,
     credit: str,
     token: str,
     channels: list,        # list of channel_id strings
     status_cb=None,
-    progress_cb=None
+    progress_cb=None,
+    checkpoint_cb=None,    # called with the forwarding checkpoint (see resume_uploader)
+    counts=(0, 0),         # videos, pdfs the job already forwarded (earlier batches)
+    workdir: str = None,   # job scratch dir, for the download fallback
+    expect: int = None,    # videos + pdfs (counted on from `counts`) once this batch is done
+    job_id: int = None     # records copies in media_deliveries and skips files a channel has
 ) -> dict:
     """
-    Returns {"videos": int, "pdfs": int}
+    Returns {"videos": int, "pdfs": int, "channels": {ch: stats}, "missing": int}:
+    videos and pdfs counted on from `counts`; stats are the Forwarder's
+    per-channel copied / failed / skipped / dead for this batch, plus (with
+    a job_id) "handled": how many of the batch's files the channel has,
+    resume included; missing: how many of `expect` never came.
     Raises UploaderError on failure.
     """
 
@@ -44,168 +72,241 @@ async def run_uploader(
         print(f"[UPL] {msg}")
         if status_cb: await status_cb(msg)
 
-    # ── 1. /start ──
-    await st("📡 /start → uploader bot")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, "/start", delay=4)
-
-    # ── 2. Secret command ──
-    await st(f"🔐 Sending secret command: {secret_cmd}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, secret_cmd, delay=10)
-
-    # Wait for file prompt
-    await ub_wait_reply(
-        bot_un, lid, timeout=30,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["file", "txt", "send", "bhejo", "upload"]
-        )
-    )
+    async def send_txt(_):
+        if isinstance(txt, str):
+            return await ub_send_doc(bot_un, txt)
+        since = metrics.mark()
+        try:
+            return await ub_copy_doc(txt.chat, txt.msg_id, bot_un)
+        except RPCError as e:
+            await st(f"↪️ Can't copy the txt ({type(e).__name__}) — sending it by file id")
+        try:
+            return await ub_send_doc(bot_un, txt.file_id)
+        except RPCError as e:
+            await st(f"↪️ Can't send by file id ({type(e).__name__}) — downloading it")
+        path = await ub_download(txt.file_id, os.path.join(workdir or tempfile.gettempdir(),
+                                                           txt.file_name))
+        metrics.record("upl:download", since)
+        return await ub_send_doc(bot_un, path)
 
-    # ── 3. Send txt file ──
-    await st("📄 Sending txt file...")
-    lid = await ub_last_id(bot_un)
-    await ub_send_doc(bot_un, txt_path, delay=10)
-
-    # ── 4. Send "1" (start from beginning) ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=30,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["start", "index", "begin", "kahan", "number", "1"]
-        )
-    )
-    await st(f"📍 Start index → {START_INDEX}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, START_INDEX, delay=10)
-
-    # ── 5. Batch name ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=40,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["batch", "name", "course"]
-        )
-    )
-    await st(f"📚 Batch name → {batch_name}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, batch_name, delay=10)
-
-    # ── 6. Resolution "480" ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=40,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["resolution", "quality", "480", "720"]
-        )
-    )
-    await st(f"🎬 Resolution → {RESOLUTION}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, RESOLUTION, delay=10)
-
-    # ── 7. Credit name ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=40,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["credit", "watermark", "name", "@"]
-        )
-    )
-    await st(f"✍️ Credit → {credit}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, credit, delay=10)
-
-    # ── 8. PW Token ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=40,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["token", "pw token", "access"]
-        )
-    )
-    await st("🔑 Sending PW token...")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, token, delay=10)
-
-    # ── 9. Thumbnail → "no" ──
-    await ub_wait_reply(
-        bot_un, lid, timeout=40,
-        check=lambda m: m.text and any(
-            w in m.text.lower() for w in ["thumbnail", "thumb", "image", "poster", "url"]
-        )
-    )
-    await st(f"🖼️ Thumbnail → {THUMBNAIL}")
-    lid = await ub_last_id(bot_un)
-    await ub_send(bot_un, THUMBNAIL, delay=5)
-
-    # ── 10. Monitor + forward ──
-    await st("⏳ Bot processing (15-25 min)... Forwarding files as they arrive...")
-    videos, pdfs = await _monitor_forward(
-        bot_un=bot_un,
-        after_id=lid,
+    dialog = Dialog(bot_un, [
+        Intent("welcome", match=lambda m: True, timeout=15, blind=True, legacy=4,
+               reply=secret_cmd, note=f"🔐 Sending secret command: {secret_cmd}"),
+        Intent("file", words=("file", "txt", "bhejo", "upload"), loose=("send",),
+               after=("welcome",), timeout=30, blind=True, legacy=10,
+               reply=send_txt, note="📄 Sending txt file..."),
+        Intent("index", words=("index", "start from", "kahan se", "begin"),
+               loose=("start", "number", "1"),
+               after=("file",), blind=True, timeout=30, legacy=10,
+               reply=START_INDEX, note=f"📍 Start index → {START_INDEX}"),
+        Intent("batch", words=("batch", "course"), loose=("name",),
+               after=("file",), blind=True, legacy=10,
+               reply=batch_name, note=f"📚 Batch name → {batch_name}"),
+        Intent("resolution", words=("resolution", "quality", "480", "720"),
+               after=("file",), blind=True, legacy=10,
+               reply=RESOLUTION, note=f"🎬 Resolution → {RESOLUTION}"),
+        Intent("credit", words=("credit", "watermark"), loose=("name", "@"),
+               after=("file",), blind=True, legacy=10,
+               reply=credit, note=f"✍️ Credit → {credit}"),
+        Intent("token", words=("token",), loose=("access",),
+               after=("file",), blind=True, legacy=10,
+               reply=token, note="🔑 Sending PW token..."),
+        Intent("thumbnail", words=("thumbnail", "thumb", "poster"), loose=("image", "url"),
+               after=("file",), blind=True, legacy=15,
+               reply=THUMBNAIL, note=f"🖼️ Thumbnail → {THUMBNAIL}"),
+    ], tag="upl", status_cb=st)
+
+    # The uploader chat is ours from /start until the last file is
+    # forwarded — another job's files there would be forwarded too.
+    async with scheduler.lease(bot_un, batch_name, "upl:queue", _queued(bot_un, st)):
+
+        # ── /start → secret cmd → txt → index, batch, resolution,
+        #    credit, token, thumbnail (in whatever order the bot asks) ──
+        await st("📡 /start → uploader bot")
+        lid = (await ub_send(bot_un, "/start")).id
+        try:
+            await dialog.run(lid)
+        except DialogError as e:
+            raise UploaderError(str(e))
+
+        # ── 10. Monitor + forward ──
+        # from the .txt on: the bot may post files while a prompt it never
+        # asked is still being waited out
+        await st("⏳ Bot processing (15-25 min)... Forwarding files as they arrive...")
+        upload_id = dialog.sent.get("file", dialog.last_id)
+        ck = {
+            "upl_chat":    bot_un,
+            "last_msg_id": upload_id,
+            "marks":       {},
+            "videos":      counts[0],
+            "pdfs":        counts[1],
+            "deadline":    time.time() + MONITOR_TIMEOUT,
+            "expect":      expect,
+            "since_id":    upload_id,
+            "prompts_id":  dialog.last_id,   # not saved: only matters before the first checkpoint
+            "job_id":      job_id,
+        }
+        if checkpoint_cb: checkpoint_cb(ck)
+        return await _resume(ck, channels, status_cb, progress_cb, checkpoint_cb)
+
+
+async def resume_uploader(
+    ck: dict,
+    channels: list,
+    status_cb=None,
+    progress_cb=None,
+    checkpoint_cb=None
+) -> dict:
+    """
+    Monitor + forward from a checkpoint, skipping Phase 1 and the prompts:
+      upl_chat     — uploader bot
+      last_msg_id  — every message up to here is handled in every channel
+      marks        — per channel: last message id it has handled
+      videos/pdfs  — counted up to last_msg_id
+      deadline     — epoch seconds the monitor gives up at
+      expect       — videos + pdfs at which the batch is complete (None: unknown)
+      since_id     — the batch's files are the messages after this one
+      prompts_id   — optional: the dialog's last message (prompts aren't read as DONE)
+      job_id       — for the delivered-media index (None: not recorded)
+    Returns {"videos": int, "pdfs": int, "channels": {ch: stats}, "missing": int}
+    (see run_uploader)
+    """
+    async def st(msg):
+        if status_cb: await status_cb(msg)
+
+    async with scheduler.lease(ck["upl_chat"], "resumed", "upl:queue", _queued(ck["upl_chat"], st)):
+        return await _resume(ck, channels, status_cb, progress_cb, checkpoint_cb)
+
+
+def _queued(bot_un, st):
+    async def on_wait(ahead):
+        await st(f"🕒 Waiting for {bot_un} — {ahead} job(s) ahead")
+    return on_wait
+
+
+async def _resume(ck, channels, status_cb, progress_cb, checkpoint_cb) -> dict:
+    since = metrics.mark()
+    videos, pdfs, stats = await _monitor_forward(
+        ck=ck,
         channels=channels,
         status_cb=status_cb,
         progress_cb=progress_cb,
-        timeout=2700   # 45 min max
+        checkpoint_cb=checkpoint_cb,
+        timeout=max(0, ck["deadline"] - time.time())
     )
-    return {"videos": videos, "pdfs": pdfs}
+    metrics.record("upl:monitor", since)
+    if ck.get("job_id") and ck.get("since_id") is not None:
+        for ch, s in stats.items():
+            # copied or already there, before an interruption too (media_deliveries)
+            s["handled"] = await aio.count_job_media(ck["job_id"], ck["upl_chat"], ch, ck["since_id"])
+    expect = ck.get("expect")
+    missing = max(0, expect - videos - pdfs) if expect else 0
+    return {"videos": videos, "pdfs": pdfs, "channels": stats, "missing": missing}
 
 
 async def _monitor_forward(
-    bot_un, after_id, channels,
-    status_cb, progress_cb, timeout
+    ck, channels,
+    status_cb, progress_cb, checkpoint_cb, timeout
 ):
     async def st(msg):
         if status_cb: await status_cb(msg)
 
-    ub   = get_userbot()
-    videos = pdfs = 0
-    last  = after_id
-    deadline = asyncio.get_event_loop().time() + timeout
-
-    while asyncio.get_event_loop().time() < deadline:
-        await asyncio.sleep(5)
-
-        new_msgs = []
-        async for m in ub.get_chat_history(bot_un, limit=15):
-            if m.id <= last:
-                break
-            new_msgs.append(m)
-
-        if not new_msgs:
-            continue
-
-        new_msgs.reverse()   # oldest first
-
-        for m in new_msgs:
-            last = max(last, m.id)
-            text = m.text or m.caption or ""
-
-            # ── Check DONE ──
-            if any(w in text.lower() for w in DONE_WORDS):
-                await st("🏁 Bot signaled DONE!")
-                return videos, pdfs
-
-            # ── Forward VIDEO ──
-            if m.video:
-                for ch in channels:
-                    try:
-                        await ub_copy(bot_un, m.id, ch)
-                        await asyncio.sleep(1.5)
-                    except Exception as e:
-                        print(f"[FWD VIDEO] {ch}: {e}")
-                videos += 1
-                await st(f"🎬 Video #{videos} forwarded")
-                if progress_cb: await progress_cb(videos, pdfs)
-
-            # ── Forward PDF only ──
-            elif m.document and (m.document.file_name or "").lower().endswith(".pdf"):
-                for ch in channels:
-                    try:
-                        await ub_copy(bot_un, m.id, ch)
-                        await asyncio.sleep(1.5)
-                    except Exception as e:
-                        print(f"[FWD PDF] {ch}: {e}")
-                pdfs += 1
-                await st(f"📄 PDF #{pdfs} forwarded")
-                if progress_cb: await progress_cb(videos, pdfs)
-
-            # Skip texts, images, etc.
-
-    await st(f"⏰ Max time reached. Forwarded: {videos} videos, {pdfs} PDFs")
-    return videos, pdfs
+    bot_un   = ck["upl_chat"]
+    after_id = ck["last_msg_id"]
+    videos, pdfs = ck["videos"], ck["pdfs"]
+    fwd = Forwarder(bot_un, channels, {
+        ch: max(after_id, ck["marks"].get(ch, 0)) for ch in channels
+    }, job_id=ck.get("job_id"))
+
+    # Resume point: the stream position, held back behind any message
+    # some channel hasn't handled yet; counters are counted up to it.
+    pos     = after_id
+    pending = deque()                     # (id, kind) not yet handled everywhere
+    base    = {"video": videos, "pdf": pdfs}
+
+    def checkpoint() -> dict:
+        done = min(fwd.marks.values(), default=pos)
+        while pending and pending[0][0] <= done:
+            base[pending.popleft()[1]] += 1
+        return {**ck,
+                "last_msg_id": pending[0][0] - 1 if pending else pos,
+                "marks":       dict(fwd.marks),
+                "videos":      base["video"],
+                "pdfs":        base["pdf"]}
+
+    async def saver():
+        last = None
+        while True:
+            await asyncio.sleep(CHECKPOINT_EVERY)
+            state = checkpoint()
+            if state != last:
+                checkpoint_cb(state)
+                last = state
+
+    saving = asyncio.get_running_loop().create_task(saver()) if checkpoint_cb else None
+
+    try:
+        # Live update stream: every message exactly once, oldest first,
+        # however many the bot posts in a burst. Copies run in per-channel
+        # workers, so detection never waits on a slow channel.
+        # With a known total the monitor ends at the last expected file,
+        # or once no file has come for MONITOR_IDLE seconds (from the start).
+        expect = ck.get("expect")
+        loop   = asyncio.get_running_loop()
+        idle   = asyncio.timeout_at(loop.time() + MONITOR_IDLE if expect else None)
+        try:
+            async with aclosing(ub_stream(bot_un, after_id, timeout)) as stream, idle:
+                async for m in stream:
+                    pos  = m.id
+                    text = m.text or m.caption or ""
+
+                    # ── Check DONE ──
+                    if m.id > ck.get("prompts_id", 0) and any(w in text.lower() for w in DONE_WORDS):
+                        await st("🏁 Bot signaled DONE!")
+                        break
+
+                    # ── Forward VIDEO ──
+                    if m.video:
+                        pending.append((m.id, "video"))
+                        await fwd.put(m)
+                        videos += 1
+                        await st(f"🎬 Video #{videos} forwarded")
+                        if progress_cb: await progress_cb(videos, pdfs)
+
+                    # ── Forward PDF only ──
+                    elif m.document and (m.document.file_name or "").lower().endswith(".pdf"):
+                        pending.append((m.id, "pdf"))
+                        await fwd.put(m)
+                        pdfs += 1
+                        await st(f"📄 PDF #{pdfs} forwarded")
+                        if progress_cb: await progress_cb(videos, pdfs)
+
+                    # Skip texts, images, etc.
+                    else:
+                        continue
+
+                    if expect:
+                        if videos + pdfs >= expect:
+                            await st(f"🏁 All {expect} expected files forwarded")
+                            break
+                        idle.reschedule(loop.time() + MONITOR_IDLE)
+                else:
+                    await st(f"⏰ Max time reached. Forwarded: {videos} videos, {pdfs} PDFs")
+        except TimeoutError:
+            if not idle.expired():
+                raise                     # e.g. a request timeout, not the idle timer
+            await st(f"⏰ No new file for {MONITOR_IDLE // 60} min — "
+                     f"stopping at {videos + pdfs} of {expect}")
+    finally:
+        # cancelled (shutdown, lost lease) → stop now, the checkpoint resumes it
+        stats = await fwd.close(drain=not asyncio.current_task().cancelling())
+        if saving:
+            saving.cancel()
+            checkpoint_cb(checkpoint())
+
+    for ch, s in stats.items():
+        if s["skipped"]:
+            await st(f"⏭️ {ch}: {s['skipped']} file(s) already there — skipped")
+        if s["failed"]:
+            await st(f"⚠️ {ch}: {s['failed']} copies failed" + (f" ({s['dead']})" if s["dead"] else ""))
+    return videos, pdfs, stats
@@ -2,33 +2,57 @@
 core/userbot.py
 Pyrogram userbot — acts as your real Telegram account.
 Needed because bots cannot message other bots.
+
+Replies from peer bots are pushed to waiters and streams by an
+update dispatcher registered on the Client. History is only read to
+fill gaps (id gaps, after a reconnect, or as a slow safety sweep).
 """
 
 import asyncio
-from pyrogram import Client
+import bisect
+from collections import deque
+from contextlib import aclosing
+from pyrogram import Client, filters, enums, raw
+from pyrogram.handlers import MessageHandler, DisconnectHandler
 from pyrogram.types import Message
-from config import API_ID, API_HASH, SESSION
+from config import (
+    API_ID, API_HASH, SESSION,
+    UB_GAP_POLL, UB_BACKFILL_LIMIT
+)
+from core import metrics, ratelimit
 
 _userbot: Client | None = None
 
+_peer_ids: dict[str, int]           = {}   # "@bot" → chat_id
+_recent:   dict[int, list[Message]] = {}   # chat_id → incoming msgs, oldest first
+_last_ids: dict[int, int]           = {}   # chat_id → highest id seen (in or out)
+_waiters:  dict[int, list]          = {}   # chat_id → [(after_id, check, future)]
+_watched:  set[int]                 = set() # chats we talk to (buffered)
+_streams:  dict[int, list]          = {}   # chat_id → [asyncio.Queue] of ub_stream readers
+_seen:     set[int]                 = set() # recent ids of the shared private-chat sequence
+_seen_fifo: deque                   = deque()
+
+SEEN_MAX    = 20000   # ids remembered for gap detection
+GAP_FETCH   = 200     # ids per get_messages call
+GAP_MAX     = 2000    # bigger gaps fall back to a history sweep
+HISTORY_PAGE = 100    # messages per get_chat_history request (Telegram's maximum)
+
 
 # ─────────────────────────────
 # Start / Stop
 # ─────────────────────────────
 
 async def start_userbot() -> Client:
-    global _userbot
-
     if _userbot and _userbot.is_connected:
         return _userbot
 
-    _userbot = Client(
+    use_client(Client(
         name="ub",
         api_id=API_ID,
         api_hash=API_HASH,
         session_string=SESSION,
         no_updates=False,
-    )
+    ))
 
     await _userbot.start()
     me = await _userbot.get_me()
@@ -43,29 +67,258 @@ async def stop_userbot():
         await _userbot.stop()
 
 
+def use_client(client: Client):
+    """Install `client` as the userbot (the simulator passes a stand-in)."""
+    global _userbot
+    for state in (_peer_ids, _recent, _last_ids, _waiters, _watched, _streams,
+                  _seen, _seen_fifo):
+        state.clear()
+    _userbot = client
+    _userbot.add_handler(MessageHandler(_on_message, filters.private | filters.group))
+    _userbot.add_handler(DisconnectHandler(_on_disconnect))
+
+
 def get_userbot() -> Client:
     if not _userbot:
         raise RuntimeError("Userbot not started")
     return _userbot
 
 
+# ─────────────────────────────
+# Update dispatcher
+# ─────────────────────────────
+
+async def _on_message(_, m: Message):
+    _feed(m)
+
+
+async def _on_disconnect(_):
+    # Updates sent while we were offline are never delivered —
+    # sweep every chat someone is waiting on once we're back.
+    asyncio.get_running_loop().create_task(_backfill_waiting())
+
+
+async def _backfill_waiting():
+    for attempt in range(5):
+        await asyncio.sleep(3 * (attempt + 1))
+        try:
+            for cid in [c for c, ws in _waiters.items() if ws]:
+                await _backfill(cid, cid)
+            for q in [q for qs in _streams.values() for q in qs]:
+                q.put_nowait(None)      # ask each stream to sweep
+            return
+        except Exception as e:
+            print(f"[Userbot] backfill after reconnect failed: {e}")
+
+
+def _note_seen(m: Message):
+    # Private chats and basic groups share one message-id sequence per
+    # account, so an id we never saw anywhere is a real gap.
+    if m.chat.type in (enums.ChatType.CHANNEL, enums.ChatType.SUPERGROUP):
+        return
+    if m.id not in _seen:
+        _seen.add(m.id)
+        _seen_fifo.append(m.id)
+        if len(_seen_fifo) > SEEN_MAX:
+            _seen.discard(_seen_fifo.popleft())
+
+
+def _feed(m: Message):
+    """Add one message to its chat buffer and wake waiters and streams."""
+    if not m.chat:
+        return
+    _note_seen(m)
+    cid = m.chat.id
+    _last_ids[cid] = max(_last_ids.get(cid, 0), m.id)
+    if m.outgoing or cid not in _watched:
+        return
+    for q in _streams.get(cid, []):
+        q.put_nowait(m)
+
+    buf = _recent.setdefault(cid, [])
+    ids = [x.id for x in buf]
+    i = bisect.bisect_left(ids, m.id)
+    if i < len(ids) and ids[i] == m.id:
+        return
+    buf.insert(i, m)
+    if len(buf) > UB_BACKFILL_LIMIT:
+        del buf[0]
+
+    for w in list(_waiters.get(cid, [])):
+        after_id, check, fut = w
+        if not fut.done() and m.id > after_id and _matches(m, check):
+            fut.set_result(m)
+
+
+def _matches(m: Message, check) -> bool:
+    if check is None:
+        return True
+    try:
+        return bool(check(m))
+    except Exception:
+        return False
+
+
+def _scan(cid: int, after_id: int, check) -> Message | None:
+    """Oldest buffered message after `after_id` that passes `check`."""
+    for m in _recent.get(cid, []):
+        if m.id > after_id and _matches(m, check):
+            return m
+    return None
+
+
+async def _chat_id(chat: int | str) -> int:
+    if isinstance(chat, int) or chat.lstrip("-").isdigit():
+        cid = int(chat)
+    else:
+        key = chat.lower().lstrip("@")
+        if key not in _peer_ids:
+            _peer_ids[key] = (await ratelimit.call("read", get_userbot().get_chat, chat)).id
+        cid = _peer_ids[key]
+    _watched.add(cid)
+    return cid
+
+
+async def _backfill(chat: int | str, cid: int):
+    """Gap fill: pull recent history into the buffer."""
+    floor = min((w[0] for w in _waiters.get(cid, [])), default=0)
+    async with aclosing(_history(chat, UB_BACKFILL_LIMIT)) as hist:
+        async for m in hist:
+            if m.id <= floor:
+                break
+            _feed(m)
+
+
+# ─────────────────────────────
+# Streams (lossless, in id order)
+# ─────────────────────────────
+
+async def ub_stream(chat: str, after_id: int, timeout: float):
+    """
+    Yield every incoming message of `chat` after `after_id` exactly once,
+    oldest first, as updates arrive. Id gaps are backfilled by id range
+    before the message that revealed them; a quiet stream is swept via
+    history every UB_GAP_POLL seconds. Ends after `timeout` seconds.
+    """
+    cid  = await _chat_id(chat)
+    loop = asyncio.get_running_loop()
+    end  = loop.time() + timeout
+    q: asyncio.Queue = asyncio.Queue()
+    for m in _recent.get(cid, []):
+        if m.id > after_id:
+            q.put_nowait(m)
+    _streams.setdefault(cid, []).append(q)
+    last = after_id
+
+    try:
+        while (left := end - loop.time()) > 0:
+            try:
+                m = await asyncio.wait_for(q.get(), min(left, UB_GAP_POLL))
+            except asyncio.TimeoutError:
+                m = None
+            if m is None:
+                batch = await _sweep(chat, last)
+            elif m.id <= last:
+                continue
+            else:
+                batch = await _fill_gap(chat, cid, last, m.id) + [m]
+            for x in batch:
+                if x.id > last:
+                    last = x.id
+                    yield x
+    finally:
+        _streams[cid].remove(q)
+
+
+async def _fill_gap(chat, cid: int, last: int, upto: int) -> list[Message]:
+    """Messages of `chat` with last < id < upto that never arrived as updates."""
+    missing = [i for i in range(last + 1, upto) if i not in _seen]
+    if not missing:
+        return []
+    if len(missing) > GAP_MAX:
+        return [m for m in await _sweep(chat, last) if m.id < upto]
+    found = []
+    for i in range(0, len(missing), GAP_FETCH):
+        got = await ratelimit.call("read", get_userbot().get_messages,
+                                   chat, missing[i:i + GAP_FETCH])
+        for m in got:
+            if not m.empty:
+                _note_seen(m)
+                if m.chat and m.chat.id == cid and not m.outgoing:
+                    found.append(m)
+    if found:
+        print(f"[Userbot] backfilled {len(found)} msg(s) in gap {last}..{upto} of {chat}")
+    return sorted(found, key=lambda m: m.id)
+
+
+async def _sweep(chat, last: int) -> list[Message]:
+    """Every incoming message after `last`, from history (paged, unbounded)."""
+    out = []
+    try:
+        async with aclosing(_history(chat)) as hist:
+            async for m in hist:
+                if m.id <= last:
+                    break
+                _note_seen(m)
+                if not m.outgoing:
+                    out.append(m)
+    except Exception as e:
+        print(f"[Userbot] sweep {chat}: {e}")
+    return out[::-1]
+
+
+async def _history(chat, limit: int = 0):
+    """Chat history newest first (all of it if no `limit`), one "read" call per page."""
+    async def page(offset_id: int, size: int) -> list[Message]:
+        return [m async for m in get_userbot().get_chat_history(chat, limit=size, offset_id=offset_id)]
+
+    offset, n = 0, 0
+    while True:
+        size = min(HISTORY_PAGE, limit - n) if limit else HISTORY_PAGE
+        got  = await ratelimit.call("read", page, offset, size)
+        for m in got:
+            yield m
+        n += len(got)
+        if len(got) < size or (limit and n >= limit):
+            return
+        offset = got[-1].id
+
+
 # ─────────────────────────────
 # Core helpers
 # ─────────────────────────────
 
-async def ub_send(chat: str, text: str, delay: float = 3.0):
-    await get_userbot().send_message(chat, text)
-    await asyncio.sleep(delay)
+async def ub_send(chat: str, text: str) -> Message:
+    cid  = await _chat_id(chat)
+    sent = await ratelimit.call("send", get_userbot().send_message, chat, text, key=cid)
+    _feed(sent)
+    return sent
 
 
-async def ub_send_doc(chat: str, path: str, delay: float = 8.0):
-    await get_userbot().send_document(chat, path)
-    await asyncio.sleep(delay)
+async def ub_send_doc(chat: str, path: str) -> Message:
+    cid  = await _chat_id(chat)
+    sent = await ratelimit.call("send", get_userbot().send_document, chat, path, key=cid)
+    _feed(sent)
+    return sent
+
+
+async def ub_copy_doc(from_chat: str, msg_id: int, to_chat: str) -> Message:
+    """Copy one of our chats' messages into another (e.g. a file between bots)."""
+    cid  = await _chat_id(to_chat)
+    sent = await ratelimit.call("send", get_userbot().copy_message,
+                                chat_id=cid, from_chat_id=from_chat, message_id=msg_id, key=cid)
+    _feed(sent)
+    return sent
 
 
 async def ub_last_id(chat: str) -> int:
-    async for m in get_userbot().get_chat_history(chat, limit=1):
-        return m.id
+    cid = await _chat_id(chat)
+    if cid in _last_ids:
+        return _last_ids[cid]
+    async with aclosing(_history(chat, 1)) as hist:
+        async for m in hist:
+            _last_ids[cid] = max(_last_ids.get(cid, 0), m.id)
+            return m.id
     return 0
 
 
@@ -76,26 +329,39 @@ async def ub_wait_reply(
     check=None
 ) -> Message | None:
 
-    ub = get_userbot()
-
-    loop = asyncio.get_running_loop()   # ✅ FIXED
-    deadline = loop.time() + timeout
-
-    last = after_id
-
-    while loop.time() < deadline:
-        await asyncio.sleep(3)
-
-        async for m in ub.get_chat_history(chat, limit=8):
-            if m.id <= last:
-                break
-
-            last = max(last, m.id)
-
-            if check is None or check(m):
-                return m
-
-    return None
+    cid = await _chat_id(chat)
+    hit = _scan(cid, after_id, check)
+    if hit:
+        return hit
+
+    loop     = asyncio.get_running_loop()
+    t0       = loop.time()
+    deadline = t0 + timeout
+    fut      = loop.create_future()
+    waiter   = (after_id, check, fut)
+    _waiters.setdefault(cid, []).append(waiter)
+
+    try:
+        while (left := deadline - loop.time()) > 0:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(fut), min(left, UB_GAP_POLL)
+                )
+            except asyncio.TimeoutError:
+                pass
+            # Safety sweep in case an update got lost
+            try:
+                await _backfill(chat, cid)
+            except Exception as e:
+                print(f"[Userbot] backfill {chat}: {e}")
+            if fut.done():
+                return fut.result()
+        return None
+    finally:
+        metrics.add_wait(loop.time() - t0)
+        _waiters[cid].remove(waiter)
+        if not fut.done():
+            fut.cancel()
 
 
 async def ub_wait_file(chat: str, after_id: int, ext=".txt", timeout=300) -> Message | None:
@@ -110,10 +376,11 @@ async def ub_wait_file(chat: str, after_id: int, ext=".txt", timeout=300) -> Mes
     )
 
 
-async def ub_download(msg: Message, path: str) -> str:
+async def ub_download(msg: Message | str, path: str) -> str:
+    """Download a message's media, or a file by file_id, to `path`."""
     import os
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    return await get_userbot().download_media(msg, file_name=path)
+    return await ratelimit.call("download", get_userbot().download_media, msg, file_name=path)
 
 
 async def ub_click_btn(msg: Message, keyword: str) -> bool:
@@ -124,8 +391,7 @@ async def ub_click_btn(msg: Message, keyword: str) -> bool:
         for btn in row:
             if keyword.lower() in (btn.text or "").lower():
                 try:
-                    await msg.click(btn.text)
-                    await asyncio.sleep(2)
+                    await ratelimit.call("send", msg.click, btn.text, key=msg.chat.id)
                     return True
                 except Exception:
                     pass
@@ -134,9 +400,59 @@ async def ub_click_btn(msg: Message, keyword: str) -> bool:
 
 
 async def ub_copy(from_chat: str, msg_id: int, to_chat: int | str):
-    """Copy (no forward tag) a single message."""
-    await get_userbot().copy_message(
+    """Copy (no forward tag) a single message; FloodWaits are waited out and retried."""
+    await ratelimit.call(
+        "copy", get_userbot().copy_message,
         chat_id=int(to_chat),
         from_chat_id=from_chat,
-        message_id=msg_id
+        message_id=msg_id,
+        key=int(to_chat)
+    )
+
+
+async def ub_forward(from_chat: str, msg_ids: list[int], to_chat: int | str) -> list[int]:
+    """
+    Forward several messages in one call, without the forward header
+    (drop_author). Returns the ids (of `msg_ids`) that arrived in `to_chat`.
+    """
+    client = get_userbot()
+
+    async def forward():
+        rids = [client.rnd_id() for _ in msg_ids]
+        r = await client.invoke(raw.functions.messages.ForwardMessages(
+            from_peer=await client.resolve_peer(from_chat),
+            to_peer=await client.resolve_peer(int(to_chat)),
+            id=list(msg_ids),
+            random_id=rids,
+            drop_author=True,
+        ))
+        # each new message comes with an UpdateMessageID carrying its random_id
+        src = dict(zip(rids, msg_ids))
+        got = {src[u.random_id] for u in r.updates
+               if isinstance(u, raw.types.UpdateMessageID) and u.random_id in src}
+        return [i for i in msg_ids if i in got]
+
+    return await ratelimit.call("copy", forward, key=int(to_chat))
+
+
+async def ub_messages(chat: str, msg_ids: list[int]) -> list[Message]:
+    """The messages with these ids that still exist, in id order."""
+    out = []
+    for i in range(0, len(msg_ids), GAP_FETCH):
+        got = await ratelimit.call("read", get_userbot().get_messages, chat, msg_ids[i:i + GAP_FETCH])
+        out += [m for m in got if not m.empty]
+    return sorted(out, key=lambda m: m.id)
+
+
+async def ub_album(chat: str, msg_id: int) -> list[Message]:
+    """Every message of the album `msg_id` belongs to."""
+    return await ratelimit.call("read", get_userbot().get_media_group, chat, msg_id)
+
+
+async def ub_copy_album(from_chat: str, msg_id: int, to_chat: int | str) -> int:
+    """Copy a whole album as an album (no forward tag); returns the number of items sent."""
+    sent = await ratelimit.call(
+        "copy", get_userbot().copy_media_group,
+        chat_id=int(to_chat), from_chat_id=from_chat, message_id=msg_id, key=int(to_chat)
     )
+    return len(sent)
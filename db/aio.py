@@ -0,0 +1,108 @@
+"""
+db/aio.py
+Async facade over db/database.py for handlers and workflows.
+
+Same names, awaited:  from db.aio import get_user  →  await get_user(uid)
+
+Every call runs on one dedicated thread, in submission order, so a slow
+disk write never blocks the event loop and writes land in the order
+they were issued. submit() queues a write without waiting for it.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from db import database
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+
+def _async(fn):
+    @functools.wraps(fn)
+    async def call(*args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            _executor, functools.partial(fn, *args, **kwargs)
+        )
+    return call
+
+
+def submit(fn, *args, **kwargs):
+    """Fire-and-forget: queue `fn` (a function of this module) behind pending calls."""
+    fut = _executor.submit(getattr(fn, "__wrapped__", fn), *args, **kwargs)
+    fut.add_done_callback(_log_error)
+    return fut
+
+
+def _log_error(fut):
+    if not fut.cancelled() and fut.exception():
+        print(f"[DB] ⚠️ background write failed: {fut.exception()}")
+
+
+def shutdown():
+    """Wait for queued calls to finish (before database.close_db())."""
+    _executor.shutdown(wait=True)
+
+
+# ── USER ──
+upsert_user      = _async(database.upsert_user)
+get_user         = _async(database.get_user)
+is_sudo          = _async(database.is_sudo)
+is_subscribed    = _async(database.is_subscribed)
+is_banned        = _async(database.is_banned)
+is_allowed       = _async(database.is_allowed)
+set_subscribed   = _async(database.set_subscribed)
+ban_user         = _async(database.ban_user)
+expire_subscriptions = _async(database.expire_subscriptions)
+
+# ── SETTINGS ──
+set_token        = _async(database.set_token)
+set_extractor    = _async(database.set_extractor)
+set_uploader     = _async(database.set_uploader)
+set_uploader_cmd = _async(database.set_uploader_cmd)
+set_credit       = _async(database.set_credit)
+get_missing      = _async(database.get_missing)
+
+# ── BATCHES / CHANNELS ──
+add_batch        = _async(database.add_batch)
+del_batch        = _async(database.del_batch)
+get_batches      = _async(database.get_batches)
+add_channel      = _async(database.add_channel)
+del_channel      = _async(database.del_channel)
+get_channels     = _async(database.get_channels)
+
+# ── JOBS ──
+create_job       = _async(database.create_job)
+create_replica_job = _async(database.create_replica_job)
+get_job          = _async(database.get_job)
+get_open_job     = _async(database.get_open_job)
+queue_position   = _async(database.queue_position)
+claim_job        = _async(database.claim_job)
+renew_lease      = _async(database.renew_lease)
+requeue_stale    = _async(database.requeue_stale)
+release_jobs     = _async(database.release_jobs)
+save_checkpoint  = _async(database.save_checkpoint)
+finish_job       = _async(database.finish_job)
+advance_batch    = _async(database.advance_batch)
+get_delivered    = _async(database.get_delivered)
+load_checkpoint  = database.load_checkpoint          # pure — no I/O
+job_batches      = database.job_batches              # pure — no I/O
+
+# ── MEDIA DELIVERIES ──
+get_media_delivered  = _async(database.get_media_delivered)
+get_job_media        = _async(database.get_job_media)
+count_job_media      = _async(database.count_job_media)
+add_media_deliveries = _async(database.add_media_deliveries)
+
+# ── STATS ──
+get_stats        = _async(database.get_stats)
+add_step_stats   = _async(database.add_step_stats)
+get_step_stats   = _async(database.get_step_stats)
+get_all_user_ids = _async(database.get_all_user_ids)
+
+# ── BROADCASTS ──
+create_broadcast       = _async(database.create_broadcast)
+get_broadcast          = _async(database.get_broadcast)
+get_open_broadcasts    = _async(database.get_open_broadcasts)
+get_pending_recipients = _async(database.get_pending_recipients)
+mark_recipient         = _async(database.mark_recipient)
+finish_broadcast       = _async(database.finish_broadcast)
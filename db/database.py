@@ -1,19 +1,51 @@
 import sqlite3
 import os
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from config import SUDO_USERS
+from config import SUDO_USERS, USER_CACHE_SIZE
 
 DB_PATH = os.getenv("DB_PATH", "bot.db")
 
+# One long-lived connection for the whole process, shared under a lock.
+_conn: sqlite3.Connection | None = None
+_lock = threading.RLock()
 
+
+def _open() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        dir_name = os.path.dirname(DB_PATH)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("PRAGMA busy_timeout=5000")
+    return _conn
+
+
+@contextmanager
 def get_conn():
-    dir_name = os.path.dirname(DB_PATH)
-    if dir_name:
-        os.makedirs(dir_name, exist_ok=True)
+    """`with get_conn() as c:` — the shared connection; commits on exit, rolls back on error."""
+    with _lock:
+        conn = _open()
+        with conn:
+            yield conn
+
 
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+def close_db():
+    """Checkpoint the WAL and close the connection (on shutdown)."""
+    global _conn
+    with _lock:
+        _users.clear()
+        if _conn is not None:
+            _conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            _conn.close()
+            _conn = None
 
 
 def init_db():
@@ -32,6 +64,7 @@ def init_db():
                 sub_expiry     TEXT,
                 is_sudo        INTEGER DEFAULT 0,
                 is_banned      INTEGER DEFAULT 0,
+                is_blocked     INTEGER DEFAULT 0,
                 created_at     TEXT DEFAULT (datetime('now')),
                 updated_at     TEXT DEFAULT (datetime('now'))
             );
@@ -58,34 +91,198 @@ def init_db():
                 user_id          INTEGER,
                 batch_name       TEXT,
                 channel_id       TEXT,
-                status           TEXT DEFAULT 'pending',
+                status           TEXT DEFAULT 'queued',
                 videos_forwarded INTEGER DEFAULT 0,
                 pdfs_forwarded   INTEGER DEFAULT 0,
                 error_msg        TEXT,
                 started_at       TEXT DEFAULT (datetime('now')),
-                finished_at      TEXT
+                finished_at      TEXT,
+                status_chat      INTEGER,
+                status_msg       INTEGER,
+                lease_owner      TEXT,
+                lease_until      TEXT,
+                attempts         INTEGER DEFAULT 0,
+                queued_at        TEXT,
+                phase            TEXT,
+                upl_chat         TEXT,
+                last_msg_id      INTEGER,
+                fwd_marks        TEXT,
+                monitor_until    REAL,
+                batches          TEXT,
+                batches_done     INTEGER DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS step_stats (
+                step    TEXT PRIMARY KEY,
+                runs    INTEGER DEFAULT 0,
+                secs    REAL DEFAULT 0,
+                slept   REAL DEFAULT 0,
+                legacy  REAL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                name   TEXT PRIMARY KEY,
+                value  INTEGER NOT NULL DEFAULT 0
             );
+
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                text         TEXT,
+                created_by   INTEGER,
+                status       TEXT DEFAULT 'running',
+                total        INTEGER DEFAULT 0,
+                sent         INTEGER DEFAULT 0,
+                failed       INTEGER DEFAULT 0,
+                blocked      INTEGER DEFAULT 0,
+                status_chat  INTEGER,
+                status_msg   INTEGER,
+                created_at   TEXT DEFAULT (datetime('now')),
+                finished_at  TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS broadcast_recipients (
+                broadcast_id INTEGER,
+                user_id      INTEGER,
+                status       TEXT DEFAULT 'pending',
+                PRIMARY KEY (broadcast_id, user_id)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS delivered_entries (
+                user_id      INTEGER,
+                batch_name   TEXT,
+                channel_id   TEXT,
+                entry_key    TEXT,
+                job_id       INTEGER,
+                delivered_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (user_id, batch_name, channel_id, entry_key)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS media_deliveries (
+                src_chat       TEXT,
+                src_msg_id     INTEGER,
+                file_unique_id TEXT,
+                kind           TEXT,
+                file_size      INTEGER,
+                destination    TEXT,
+                job_id         INTEGER,
+                delivered_at   TEXT DEFAULT (datetime('now'))
+            );
+            CREATE INDEX IF NOT EXISTS idx_media_dest ON media_deliveries(destination, file_unique_id);
+            CREATE INDEX IF NOT EXISTS idx_media_job  ON media_deliveries(job_id);
         """)
+        _add_columns(c, "jobs", JOB_COLUMNS)
+        _add_columns(c, "user_settings", USER_COLUMNS)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, status)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_users_sub ON user_settings(is_subscribed, sub_expiry)")
+        if not c.execute("SELECT 1 FROM stats_counters LIMIT 1").fetchone():
+            _backfill_counters(c)
     print("[DB] ✅ Ready")
 
 
+# Columns added after the first release — ALTERed into older databases
+JOB_COLUMNS = {
+    "status_chat": "INTEGER",
+    "status_msg":  "INTEGER",
+    "lease_owner": "TEXT",
+    "lease_until": "TEXT",
+    "attempts":    "INTEGER DEFAULT 0",
+    "queued_at":   "TEXT",
+    "phase":         "TEXT",
+    "upl_chat":      "TEXT",
+    "last_msg_id":   "INTEGER",
+    "fwd_marks":     "TEXT",
+    "monitor_until": "REAL",
+    "fwd_expect":    "INTEGER",
+    "fwd_since":     "INTEGER",
+    "batches":       "TEXT",
+    "batches_done":  "INTEGER DEFAULT 0",
+    "kind":          "TEXT DEFAULT 'extract'",   # extract | replicate
+    "source_job":    "INTEGER",                  # replicate: the job whose files are copied
+}
+
+
+USER_COLUMNS = {
+    "is_blocked": "INTEGER DEFAULT 0",
+}
+
+
+def _backfill_counters(c):
+    # One full scan when the table is first created; kept current by
+    # _bump() in the same transaction as every write that changes them
+    row = c.execute("""
+        SELECT (SELECT COUNT(*) FROM user_settings),
+               (SELECT COUNT(*) FROM user_settings WHERE is_subscribed=1),
+               COUNT(*), COALESCE(SUM(status='done'),0),
+               COALESCE(SUM(videos_forwarded),0), COALESCE(SUM(pdfs_forwarded),0)
+        FROM jobs
+    """).fetchone()
+    c.executemany("INSERT INTO stats_counters(name,value) VALUES(?,?)", zip(COUNTERS, row))
+
+
+def _add_columns(c, table: str, cols: dict):
+    have = {r["name"] for r in c.execute(f"PRAGMA table_info({table})")}
+    for name, decl in cols.items():
+        if name not in have:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+# ── STATS COUNTERS ──
+COUNTERS = ("users", "subscribed", "jobs", "done", "videos", "pdfs")
+
+
+def _bump(c, **deltas):
+    c.executemany(
+        "UPDATE stats_counters SET value=value+? WHERE name=?",
+        [(v, k) for k, v in deltas.items() if v]
+    )
+
+
 # ── USER ──
+# user_settings rows are cached (LRU, misses included); every write to
+# the table goes through a function below that calls _forget().
+_users: OrderedDict[int, dict | None] = OrderedDict()
+
+
+def _forget(uid):
+    with _lock:
+        _users.pop(uid, None)
+
+
 def upsert_user(uid, username, first_name):
+    u = get_user(uid)
+    if (u and u["username"] == (username or "") and u["first_name"] == (first_name or "")
+            and not u["is_blocked"]):
+        return
     with get_conn() as c:
-        c.execute("""
-            INSERT INTO user_settings (user_id, username, first_name)
-            VALUES (?,?,?)
-            ON CONFLICT(user_id) DO UPDATE SET
-                username=excluded.username,
-                first_name=excluded.first_name,
-                updated_at=datetime('now')
-        """, (uid, username or "", first_name or ""))
+        new = c.execute(
+            "INSERT OR IGNORE INTO user_settings (user_id, username, first_name) VALUES (?,?,?)",
+            (uid, username or "", first_name or "")
+        ).rowcount
+        if new:
+            _bump(c, users=1)
+        else:
+            c.execute("""
+                UPDATE user_settings SET username=?, first_name=?, is_blocked=0,
+                    updated_at=datetime('now')
+                WHERE user_id=?
+            """, (username or "", first_name or "", uid))
+        _forget(uid)
 
 
 def get_user(uid) -> dict | None:
-    with get_conn() as c:
-        r = c.execute("SELECT * FROM user_settings WHERE user_id=?", (uid,)).fetchone()
-        return dict(r) if r else None
+    with _lock:
+        if uid in _users:
+            _users.move_to_end(uid)
+            u = _users[uid]
+            return dict(u) if u else None
+        with get_conn() as c:
+            r = c.execute("SELECT * FROM user_settings WHERE user_id=?", (uid,)).fetchone()
+        u = dict(r) if r else None
+        _users[uid] = u
+        if len(_users) > USER_CACHE_SIZE:
+            _users.popitem(last=False)
+        return dict(u) if u else None
 
 
 def is_sudo(uid: int) -> bool:
@@ -117,22 +314,49 @@ def is_allowed(uid: int) -> bool:
     return not is_banned(uid) and is_subscribed(uid)
 
 
+def _was_subscribed(c, uid) -> int:
+    r = c.execute("SELECT is_subscribed FROM user_settings WHERE user_id=?", (uid,)).fetchone()
+    return r[0] if r else 0
+
+
 def _set_sub(uid, status):
     with get_conn() as c:
-        c.execute(
+        was = _was_subscribed(c, uid)
+        n = c.execute(
             "UPDATE user_settings SET is_subscribed=?,updated_at=datetime('now') WHERE user_id=?",
             (1 if status else 0, uid)
-        )
+        ).rowcount
+        if n:
+            _bump(c, subscribed=(1 if status else 0) - was)
+        _forget(uid)
 
 
 def set_subscribed(uid: int, status: bool, days: int = 30):
     expiry = (datetime.now() + timedelta(days=days)).isoformat() if status else None
     with get_conn() as c:
-        c.execute("""
+        was = _was_subscribed(c, uid)
+        n = c.execute("""
             UPDATE user_settings
             SET is_subscribed=?, sub_expiry=?, updated_at=datetime('now')
             WHERE user_id=?
-        """, (1 if status else 0, expiry, uid))
+        """, (1 if status else 0, expiry, uid)).rowcount
+        if n:
+            _bump(c, subscribed=(1 if status else 0) - was)
+        _forget(uid)
+
+
+def expire_subscriptions() -> int:
+    """Switch off subscriptions past their expiry (index range scan)."""
+    with get_conn() as c:
+        rows = c.execute("""
+            UPDATE user_settings SET is_subscribed=0, updated_at=datetime('now')
+            WHERE is_subscribed=1 AND sub_expiry < ?
+            RETURNING user_id
+        """, (datetime.now().isoformat(),)).fetchall()
+        _bump(c, subscribed=-len(rows))
+        for r in rows:
+            _forget(r["user_id"])
+        return len(rows)
 
 
 def ban_user(uid: int, status: bool):
@@ -141,6 +365,7 @@ def ban_user(uid: int, status: bool):
             "UPDATE user_settings SET is_banned=?,updated_at=datetime('now') WHERE user_id=?",
             (1 if status else 0, uid)
         )
+        _forget(uid)
 
 
 # ── SETTINGS ──
@@ -150,6 +375,7 @@ def _upd(uid, field, val):
             f"UPDATE user_settings SET {field}=?,updated_at=datetime('now') WHERE user_id=?",
             (val, uid)
         )
+        _forget(uid)
 
 
 def set_token(uid, v):       _upd(uid, "token", v)
@@ -219,38 +445,334 @@ def get_channels(uid) -> list:
         return [{"id": r["channel_id"], "name": r["channel_name"]} for r in rows]
 
 
-# ── JOBS ──
-def create_job(uid, batch, channel) -> int:
+# ── JOBS (durable queue: queued → running → done / incomplete / failed) ──
+def create_job(uid, batches, channel, status_chat=None, status_msg=None) -> int:
+    """`batches`: one batch name, or a list run in order by the same job."""
+    names = [batches] if isinstance(batches, str) else list(batches)
     with get_conn() as c:
-        cur = c.execute(
-            "INSERT INTO jobs(user_id,batch_name,channel_id,status) VALUES(?,?,?,'running')",
-            (uid, batch, channel)
-        )
+        cur = c.execute("""
+            INSERT INTO jobs(user_id,batch_name,batches,channel_id,status,status_chat,status_msg,queued_at)
+            VALUES(?,?,?,?,'queued',?,?,datetime('now'))
+        """, (uid, " + ".join(names), json.dumps(names), channel, status_chat, status_msg))
+        _bump(c, jobs=1)
         return cur.lastrowid
 
 
-def finish_job(job_id, status, videos=0, pdfs=0, error=None):
+def create_replica_job(uid, source_job: dict, channel, status_chat=None, status_msg=None) -> int:
+    """Queue a copy of a finished job's files to another channel (see handlers/replicate.py)."""
+    with get_conn() as c:
+        cur = c.execute("""
+            INSERT INTO jobs(user_id,batch_name,batches,channel_id,status,status_chat,status_msg,
+                             queued_at,kind,source_job)
+            VALUES(?,?,?,?,'queued',?,?,datetime('now'),'replicate',?)
+        """, (uid, source_job["batch_name"], source_job["batches"], channel,
+              status_chat, status_msg, source_job["id"]))
+        _bump(c, jobs=1)
+        return cur.lastrowid
+
+
+def get_job(job_id) -> dict | None:
+    with get_conn() as c:
+        r = c.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return dict(r) if r else None
+
+
+def get_open_job(uid) -> dict | None:
+    """The user's queued or running job, if any."""
+    with get_conn() as c:
+        r = c.execute(
+            "SELECT * FROM jobs WHERE user_id=? AND status IN ('queued','running') ORDER BY id LIMIT 1",
+            (uid,)
+        ).fetchone()
+        return dict(r) if r else None
+
+
+def queue_position(job_id) -> int:
+    """Queued jobs ahead of this one."""
+    with get_conn() as c:
+        return c.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status='queued' AND id<?", (job_id,)
+        ).fetchone()[0]
+
+
+def claim_job(owner: str, lease_secs: float) -> dict | None:
+    """Atomically lease the oldest queued job to `owner`."""
+    with get_conn() as c:
+        r = c.execute("""
+            UPDATE jobs SET status='running', lease_owner=?,
+                lease_until=datetime('now', ? || ' seconds'),
+                attempts=attempts+1, started_at=datetime('now')
+            WHERE id=(SELECT id FROM jobs WHERE status='queued' ORDER BY id LIMIT 1)
+            RETURNING *
+        """, (owner, f"+{int(lease_secs)}")).fetchone()
+        return dict(r) if r else None
+
+
+def renew_lease(job_id, owner: str, lease_secs: float) -> bool:
+    """Extend a running job's lease; False if it is no longer ours."""
+    with get_conn() as c:
+        cur = c.execute("""
+            UPDATE jobs SET lease_until=datetime('now', ? || ' seconds')
+            WHERE id=? AND lease_owner=? AND status='running'
+        """, (f"+{int(lease_secs)}", job_id, owner))
+        return cur.rowcount == 1
+
+
+def requeue_stale(max_attempts: int) -> int:
+    """
+    Put running jobs whose lease ran out back in the queue (or fail them
+    after `max_attempts`). Rows from before the queue have no lease and
+    cannot be resumed — they are closed as failed.
+    """
     with get_conn() as c:
+        failed = c.execute("""
+            UPDATE jobs SET status='failed', finished_at=datetime('now'), lease_owner=NULL,
+                error_msg=CASE WHEN lease_until IS NULL THEN 'Interrupted by restart'
+                               ELSE 'Gave up after ' || attempts || ' attempts' END
+            WHERE status='running' AND (lease_until IS NULL
+                  OR (lease_until < datetime('now') AND attempts >= ?))
+        """, (max_attempts,)).rowcount
+        requeued = c.execute("""
+            UPDATE jobs SET status='queued', lease_owner=NULL, lease_until=NULL
+            WHERE status='running' AND lease_until < datetime('now')
+        """).rowcount
+        return requeued + failed
+
+
+def release_jobs(owner: str) -> int:
+    """Hand `owner`'s running jobs back to the queue (clean shutdown)."""
+    with get_conn() as c:
+        return c.execute("""
+            UPDATE jobs SET status='queued', lease_owner=NULL, lease_until=NULL,
+                attempts=MAX(attempts-1, 0)
+            WHERE status='running' AND lease_owner=?
+        """, (owner,)).rowcount
+
+
+def _job_totals(c, job_id) -> tuple:
+    r = c.execute(
+        "SELECT status='done', videos_forwarded, pdfs_forwarded FROM jobs WHERE id=?", (job_id,)
+    ).fetchone()
+    return tuple(r) if r else (0, 0, 0)
+
+
+def _bump_job(c, job_id, before: tuple):
+    after = _job_totals(c, job_id)
+    _bump(c, **{k: a - (b or 0) for k, a, b in zip(("done", "videos", "pdfs"), after, before)})
+
+
+def save_checkpoint(job_id, ck: dict):
+    """Persist the forwarding checkpoint (see core.uploader.resume_uploader)."""
+    with get_conn() as c:
+        before = _job_totals(c, job_id)
         c.execute("""
-            UPDATE jobs SET status=?,videos_forwarded=?,pdfs_forwarded=?,
-            error_msg=?,finished_at=datetime('now') WHERE id=?
+            UPDATE jobs SET phase='monitor', upl_chat=?, last_msg_id=?, fwd_marks=?,
+                monitor_until=?, fwd_expect=?, fwd_since=?, videos_forwarded=?, pdfs_forwarded=?
+            WHERE id=?
+        """, (ck["upl_chat"], ck["last_msg_id"], json.dumps(ck["marks"]),
+              ck["deadline"], ck.get("expect"), ck.get("since_id"), ck["videos"], ck["pdfs"], job_id))
+        _bump_job(c, job_id, before)
+
+
+def load_checkpoint(job: dict) -> dict | None:
+    """The forwarding checkpoint of a job row, if it got that far."""
+    if job.get("phase") != "monitor":
+        return None
+    return {
+        "upl_chat":    job["upl_chat"],
+        "last_msg_id": job["last_msg_id"],
+        "marks":       json.loads(job["fwd_marks"] or "{}"),
+        "videos":      job["videos_forwarded"],
+        "pdfs":        job["pdfs_forwarded"],
+        "deadline":    job["monitor_until"],
+        "expect":      job.get("fwd_expect"),
+        "since_id":    job.get("fwd_since"),
+        "job_id":      job["id"],
+    }
+
+
+def job_batches(job: dict) -> list:
+    """Batch names of a job row (rows from before multi-batch jobs have one)."""
+    return json.loads(job["batches"]) if job.get("batches") else [job["batch_name"]]
+
+
+def advance_batch(job_id, videos, pdfs, entries=()):
+    """
+    One more batch fully forwarded; the next starts without a checkpoint.
+    `entries` (manifest keys) go into that batch's delivered ledger.
+    """
+    with get_conn() as c:
+        before = _job_totals(c, job_id)
+        if entries:
+            job   = dict(c.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+            batch = job_batches(job)[job["batches_done"]]
+            c.executemany("""
+                INSERT OR IGNORE INTO delivered_entries
+                    (user_id, batch_name, channel_id, entry_key, job_id)
+                VALUES (?,?,?,?,?)
+            """, [(job["user_id"], batch, job["channel_id"], k, job_id) for k in entries])
+        c.execute("""
+            UPDATE jobs SET batches_done=batches_done+1, phase=NULL, upl_chat=NULL,
+                last_msg_id=NULL, fwd_marks=NULL, monitor_until=NULL, fwd_expect=NULL,
+                fwd_since=NULL, videos_forwarded=?, pdfs_forwarded=?
+            WHERE id=?
+        """, (videos, pdfs, job_id))
+        _bump_job(c, job_id, before)
+
+
+def get_delivered(uid, batch_name, channel_id) -> set:
+    """Manifest keys already delivered for this user, batch and channel."""
+    with get_conn() as c:
+        rows = c.execute("""
+            SELECT entry_key FROM delivered_entries
+            WHERE user_id=? AND batch_name=? AND channel_id=?
+        """, (uid, batch_name, str(channel_id))).fetchall()
+    return {r[0] for r in rows}
+
+
+def finish_job(job_id, status, videos=None, pdfs=None, error=None):
+    """videos/pdfs left out keep what the checkpoints recorded (failed jobs)."""
+    with get_conn() as c:
+        before = _job_totals(c, job_id)
+        c.execute("""
+            UPDATE jobs SET status=?,videos_forwarded=COALESCE(?,videos_forwarded),
+            pdfs_forwarded=COALESCE(?,pdfs_forwarded),
+            error_msg=?,finished_at=datetime('now'),lease_owner=NULL,lease_until=NULL
+            WHERE id=?
         """, (status, videos, pdfs, error, job_id))
+        _bump_job(c, job_id, before)
+
+
+# ── MEDIA DELIVERIES (see core/forwarder.py) ──
+def get_media_delivered(destinations: list) -> dict:
+    """destination → set of file_unique_ids already copied there."""
+    out = {str(d): set() for d in destinations}
+    with get_conn() as c:
+        for d in out:
+            out[d] = {r[0] for r in c.execute(
+                "SELECT file_unique_id FROM media_deliveries WHERE destination=?", (d,))}
+    return out
+
+
+def get_job_media(job_id) -> list:
+    """Source messages a job delivered (once each, in source order)."""
+    with get_conn() as c:
+        rows = c.execute("""
+            SELECT src_chat, src_msg_id, MIN(file_unique_id) AS file_unique_id, MIN(kind) AS kind
+            FROM media_deliveries WHERE job_id=?
+            GROUP BY src_chat, src_msg_id ORDER BY src_chat, src_msg_id
+        """, (job_id,)).fetchall()
+        return [dict(r) for r in rows]
+
+
+def count_job_media(job_id, src_chat, destination, after_id) -> int:
+    """How many source messages after `after_id` a job recorded for `destination`."""
+    with get_conn() as c:
+        return c.execute("""
+            SELECT COUNT(DISTINCT src_msg_id) FROM media_deliveries
+            WHERE job_id=? AND src_chat=? AND destination=? AND src_msg_id>?
+        """, (job_id, src_chat, str(destination), after_id)).fetchone()[0]
+
+
+def add_media_deliveries(rows: list):
+    """rows: (src_chat, src_msg_id, file_unique_id, kind, file_size, destination, job_id)"""
+    with get_conn() as c:
+        c.executemany("""
+            INSERT INTO media_deliveries
+                (src_chat, src_msg_id, file_unique_id, kind, file_size, destination, job_id)
+            VALUES (?,?,?,?,?,?,?)
+        """, rows)
 
 
 # ── STATS ──
 def get_stats() -> dict:
+    """Totals from stats_counters — constant cost however much history is kept."""
+    expire_subscriptions()
     with get_conn() as c:
-        return {
-            "users":      c.execute("SELECT COUNT(*) FROM user_settings").fetchone()[0],
-            "subscribed": c.execute("SELECT COUNT(*) FROM user_settings WHERE is_subscribed=1").fetchone()[0],
-            "jobs":       c.execute("SELECT COUNT(*) FROM jobs").fetchone()[0],
-            "done":       c.execute("SELECT COUNT(*) FROM jobs WHERE status='done'").fetchone()[0],
-            "videos":     c.execute("SELECT COALESCE(SUM(videos_forwarded),0) FROM jobs").fetchone()[0],
-            "pdfs":       c.execute("SELECT COALESCE(SUM(pdfs_forwarded),0) FROM jobs").fetchone()[0],
-        }
+        rows = c.execute("SELECT name, value FROM stats_counters").fetchall()
+        return {r["name"]: r["value"] for r in rows}
+
+
+# ── STEP TIMINGS (pacing) ──
+def add_step_stats(steps: list):
+    """Accumulate per-step timings of one job (see core.metrics)."""
+    with get_conn() as c:
+        c.executemany("""
+            INSERT INTO step_stats(step,runs,secs,slept,legacy) VALUES(?,1,?,?,?)
+            ON CONFLICT(step) DO UPDATE SET
+                runs=runs+1, secs=secs+excluded.secs,
+                slept=slept+excluded.slept, legacy=legacy+excluded.legacy
+        """, [(s["name"], s["secs"], s["slept"], s["legacy"]) for s in steps])
+
+
+def get_step_stats() -> list:
+    with get_conn() as c:
+        rows = c.execute("SELECT * FROM step_stats ORDER BY step").fetchall()
+        return [dict(r) for r in rows]
 
 
 def get_all_user_ids() -> list:
     with get_conn() as c:
-        rows = c.execute("SELECT user_id FROM user_settings WHERE is_banned=0").fetchall()
+        rows = c.execute(
+            "SELECT user_id FROM user_settings WHERE is_banned=0 AND is_blocked=0"
+        ).fetchall()
+        return [r["user_id"] for r in rows]
+
+
+# ── BROADCASTS (see core/broadcast.py) ──
+def create_broadcast(text, created_by, status_chat=None, status_msg=None) -> int:
+    """A broadcast with one pending recipient per reachable, unbanned user."""
+    with get_conn() as c:
+        bid = c.execute(
+            "INSERT INTO broadcasts(text,created_by,status_chat,status_msg) VALUES(?,?,?,?)",
+            (text, created_by, status_chat, status_msg)
+        ).lastrowid
+        total = c.execute("""
+            INSERT INTO broadcast_recipients(broadcast_id, user_id)
+            SELECT ?, user_id FROM user_settings WHERE is_banned=0 AND is_blocked=0
+        """, (bid,)).rowcount
+        c.execute("UPDATE broadcasts SET total=? WHERE id=?", (total, bid))
+        return bid
+
+
+def get_broadcast(bid) -> dict | None:
+    with get_conn() as c:
+        r = c.execute("SELECT * FROM broadcasts WHERE id=?", (bid,)).fetchone()
+        return dict(r) if r else None
+
+
+def get_open_broadcasts() -> list:
+    with get_conn() as c:
+        rows = c.execute("SELECT * FROM broadcasts WHERE status='running' ORDER BY id").fetchall()
+        return [dict(r) for r in rows]
+
+
+def get_pending_recipients(bid) -> list:
+    with get_conn() as c:
+        rows = c.execute(
+            "SELECT user_id FROM broadcast_recipients WHERE broadcast_id=? AND status='pending'",
+            (bid,)
+        ).fetchall()
         return [r["user_id"] for r in rows]
+
+
+def mark_recipient(bid, uid, status: str):
+    """status: 'sent' | 'failed' | 'blocked' (the user is then skipped from now on)."""
+    with get_conn() as c:
+        n = c.execute("""
+            UPDATE broadcast_recipients SET status=?
+            WHERE broadcast_id=? AND user_id=? AND status='pending'
+        """, (status, bid, uid)).rowcount
+        if not n:
+            return
+        c.execute(f"UPDATE broadcasts SET {status}={status}+1 WHERE id=?", (bid,))
+        if status == "blocked":
+            c.execute("UPDATE user_settings SET is_blocked=1 WHERE user_id=?", (uid,))
+            _forget(uid)
+
+
+def finish_broadcast(bid):
+    with get_conn() as c:
+        c.execute(
+            "UPDATE broadcasts SET status='done', finished_at=datetime('now') WHERE id=?", (bid,)
+        )
@@ -1,20 +1,20 @@
-import asyncio
 from pyrogram import Client, filters
 from pyrogram.types import Message
-from db.database import (
+from core import ratelimit, scheduler, broadcast
+from db.aio import (
     upsert_user, set_subscribed, ban_user,
-    get_user, get_stats, get_all_user_ids, is_sudo
+    get_user, get_stats, is_sudo, get_step_stats, create_broadcast
 )
 
 
 def register_admin(bot: Client):
 
-    def sudo(uid): return is_sudo(uid)
+    async def sudo(uid): return await is_sudo(uid)
 
     # ── /adduser [user_id] [days] ──
     @bot.on_message(filters.command("adduser") & filters.private)
     async def cmd_add(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
         parts = msg.text.split()
         if len(parts) < 2:
@@ -28,17 +28,17 @@ def register_admin(bot: Client):
         except ValueError:
             return await msg.reply("❌ Use numbers only.")
 
-        if not get_user(tid):
-            upsert_user(tid, None, f"User_{tid}")
-        set_subscribed(tid, True, days=days)
+        if not await get_user(tid):
+            await upsert_user(tid, None, f"User_{tid}")
+        await set_subscribed(tid, True, days=days)
 
         await msg.reply(
             f"✅ **Subscribed!**\n🆔 `{tid}`\n📅 {days} days",
             parse_mode="markdown"
         )
         try:
-            await _.send_message(
-                tid,
+            await ratelimit.call(
+                "bot", _.send_message, tid,
                 f"🎉 **Access Granted!**\n\n"
                 f"You have **{days} days** of access.\n"
                 f"Use /start to begin.",
@@ -50,7 +50,7 @@ def register_admin(bot: Client):
     # ── /removeuser [user_id] ──
     @bot.on_message(filters.command("removeuser") & filters.private)
     async def cmd_remove(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
         parts = msg.text.split()
         if len(parts) < 2:
@@ -60,17 +60,18 @@ def register_admin(bot: Client):
         except ValueError:
             return await msg.reply("❌ Invalid ID.")
 
-        set_subscribed(tid, False)
+        await set_subscribed(tid, False)
         await msg.reply(f"✅ Removed: `{tid}`", parse_mode="markdown")
         try:
-            await _.send_message(tid, "⚠️ Your subscription has been removed.")
+            await ratelimit.call("bot", _.send_message, tid,
+                                 "⚠️ Your subscription has been removed.")
         except Exception:
             pass
 
     # ── /banuser [user_id] ──
     @bot.on_message(filters.command("banuser") & filters.private)
     async def cmd_ban(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
         parts = msg.text.split()
         if len(parts) < 2:
@@ -81,13 +82,13 @@ def register_admin(bot: Client):
             return await msg.reply("❌ Invalid ID.")
         if tid == msg.from_user.id:
             return await msg.reply("❌ Can't ban yourself.")
-        ban_user(tid, True)
+        await ban_user(tid, True)
         await msg.reply(f"🔨 Banned: `{tid}`", parse_mode="markdown")
 
     # ── /unbanuser [user_id] ──
     @bot.on_message(filters.command("unbanuser") & filters.private)
     async def cmd_unban(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
         parts = msg.text.split()
         if len(parts) < 2:
@@ -96,15 +97,27 @@ def register_admin(bot: Client):
             tid = int(parts[1])
         except ValueError:
             return await msg.reply("❌ Invalid ID.")
-        ban_user(tid, False)
+        await ban_user(tid, False)
         await msg.reply(f"✅ Unbanned: `{tid}`", parse_mode="markdown")
 
     # ── /stats ──
     @bot.on_message(filters.command("stats") & filters.private)
     async def cmd_stats(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
-        s = get_stats()
+        s = await get_stats()
+        steps = await get_step_stats()
+        saved = sum(r["legacy"] - r["slept"] for r in steps)
+        runs  = max((r["runs"] for r in steps), default=0)
+        rl    = ratelimit.snapshot()
+        limits = "\n".join(
+            f"`{k:<8}` {v['calls']} calls · {v['floods']} floods ({v['flood_secs']:.0f}s)"
+            + (f" · ⏸ {v['paused_for']:.0f}s" if v["paused_for"] else "")
+            for k, v in rl.items() if v["calls"]
+        ) or "no calls yet"
+        lanes = "\n".join(
+            f"`{k}` busy ({v['waiting']} waiting)" for k, v in scheduler.snapshot().items()
+        ) or "all idle"
         await msg.reply(
             "📊 **Bot Stats**\n"
             "━━━━━━━━━━━━━━━━━━━\n\n"
@@ -113,33 +126,23 @@ def register_admin(bot: Client):
             f"⚙️ Total Jobs:   **{s['jobs']}**\n"
             f"✅ Completed:    **{s['done']}**\n\n"
             f"🎬 Videos Fwd:  **{s['videos']}**\n"
-            f"📄 PDFs Fwd:    **{s['pdfs']}**",
+            f"📄 PDFs Fwd:    **{s['pdfs']}**\n\n"
+            f"⏱ Pacing saved: **{saved / 60:.1f} min** over {runs} jobs\n\n"
+            f"🚦 **API limiter** (since boot)\n{limits}\n\n"
+            f"🤖 **Peer bots**\n{lanes}",
             parse_mode="markdown"
         )
 
     # ── /broadcast [message] ──
     @bot.on_message(filters.command("broadcast") & filters.private)
     async def cmd_broadcast(_, msg: Message):
-        if not sudo(msg.from_user.id):
+        if not await sudo(msg.from_user.id):
             return await msg.reply("❌ Sudo only.")
         parts = msg.text.split(None, 1)
         if len(parts) < 2:
             return await msg.reply("Usage: `/broadcast Your message`", parse_mode="markdown")
 
-        text  = parts[1]
-        uids  = get_all_user_ids()
-        info  = await msg.reply(f"📢 Broadcasting to {len(uids)} users...")
-        sent = failed = 0
-
-        for uid in uids:
-            try:
-                await _.send_message(uid, text, parse_mode="markdown")
-                sent += 1
-                await asyncio.sleep(0.05)
-            except Exception:
-                failed += 1
-
-        await info.edit_text(
-            f"📢 **Broadcast Done**\n✅ Sent: {sent}\n❌ Failed: {failed}",
-            parse_mode="markdown"
-        )
+        # runs in the background and survives restarts (core/broadcast.py)
+        info = await msg.reply("📢 Preparing broadcast...")
+        bid  = await create_broadcast(parts[1], msg.from_user.id, info.chat.id, info.id)
+        broadcast.start(_, bid)
@@ -1,38 +1,49 @@
 import asyncio
+import os
+import shutil
+import tempfile
+from contextlib import aclosing
 from pyrogram import Client, filters
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from db.database import (
+from db import aio
+from db.aio import (
     upsert_user, get_user, get_batches, get_channels,
-    get_missing, create_job, finish_job
+    get_missing, create_job, finish_job, add_step_stats,
+    get_open_job, queue_position, save_checkpoint, load_checkpoint,
+    advance_batch, job_batches, get_delivered
 )
 from utils.helpers import is_allowed, batches_keyboard, channels_keyboard, missing_text
 from utils.states import set_state, get_state, clear_state, set_data, get_data
-from core.extractor import run_extractor, ExtractorError
-from core.uploader import run_uploader, UploaderError
-
-_active: dict[int, int] = {}   # user_id → job_id
+from utils.progress import JobRenderer
+from core.extractor import extract_batches, ExtractorError, TxtRef
+from core.uploader import run_uploader, resume_uploader, UploaderError
+from core.metrics import job_metrics
+from core import manifest, ratelimit, jobqueue, txtcache
+from config import START_INDEX, WAIT_CHOICE
 
 
 def register_extraction(bot: Client):
 
     @bot.on_message(filters.command("StartExtraction") & filters.private)
     async def cmd_extract(_, msg: Message):
-        upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
         uid = msg.from_user.id
 
-        if not is_allowed(uid):
+        if not await is_allowed(uid):
             return await msg.reply("❌ No access. Contact admin.")
-        if uid in _active:
+        if await get_open_job(uid):
             return await msg.reply("⚠️ Extraction already running! Wait for it to finish.")
 
-        miss = get_missing(uid)
+        miss = await get_missing(uid)
         if miss:
             return await msg.reply(missing_text(miss), parse_mode="markdown")
 
-        batches = get_batches(uid)
+        batches = await get_batches(uid)
+        clear_state(uid)                      # drop a picked list left by an abandoned run
         set_state(uid, "sel_batch")
         await msg.reply(
-            "🚀 **Start Extraction**\n\n**Step 1/2 — Select Batch:**",
+            "🚀 **Start Extraction**\n\n**Step 1/2 — Select Batches:**\n"
+            "_Tap one or more, then Next._",
             reply_markup=batches_keyboard(batches),
             parse_mode="markdown"
         )
@@ -43,16 +54,31 @@ def register_extraction(bot: Client):
         if get_state(uid) != "sel_batch":
             return await q.answer("Session expired — run /StartExtraction again.")
         idx     = int(q.data.split(":")[1])
-        batches = get_batches(uid)
+        batches = await get_batches(uid)
         if idx >= len(batches):
             return await q.answer("Invalid.")
-        batch = batches[idx]
-        set_data(uid, "batch", batch)
+        picked = set(get_data(uid, "picked", ()))
+        picked ^= {idx}
+        set_data(uid, "picked", sorted(picked))
+        await q.answer(("✅ " if idx in picked else "➖ ") + batches[idx][:30])
+        await q.message.edit_reply_markup(batches_keyboard(batches, selected=picked))
+
+    @bot.on_callback_query(filters.regex(r"^sb:go$"))
+    async def cb_batches_done(_, q: CallbackQuery):
+        uid = q.from_user.id
+        if get_state(uid) != "sel_batch":
+            return await q.answer("Session expired — run /StartExtraction again.")
+        batches = await get_batches(uid)
+        names   = [batches[i] for i in get_data(uid, "picked", ()) if i < len(batches)]
+        if not names:
+            return await q.answer("Select at least one batch.")
+        set_data(uid, "batches", names)
         set_state(uid, "sel_channel")
-        await q.answer(f"✅ {batch[:30]}")
-        chs = get_channels(uid)
+        await q.answer(f"✅ {len(names)} batch(es)")
+        chs = await get_channels(uid)
         await q.message.edit_text(
-            f"✅ **Batch:** `{batch}`\n\n**Step 2/2 — Select Channel:**",
+            "✅ **Batches:**\n" + "".join(f"  {i}. `{b}`\n" for i, b in enumerate(names, 1))
+            + "\n**Step 2/2 — Select Channel:**",
             reply_markup=channels_keyboard(chs),
             parse_mode="markdown"
         )
@@ -63,106 +89,232 @@ def register_extraction(bot: Client):
         if get_state(uid) != "sel_channel":
             return await q.answer("Session expired — run /StartExtraction again.")
         idx  = int(q.data.split(":")[1])
-        chs  = get_channels(uid)
+        chs  = await get_channels(uid)
         if idx >= len(chs):
             return await q.answer("Invalid.")
         ch    = chs[idx]
-        batch = get_data(uid, "batch")
+        names = get_data(uid, "batches")
         clear_state(uid)
+        if await get_open_job(uid):
+            return await q.answer("⚠️ Extraction already running!")
         await q.answer("🚀 Starting!")
-        smsg = await q.message.edit_text(
+        job_id = await create_job(uid, names, ch["id"], q.message.chat.id, q.message.id)
+        ahead  = await queue_position(job_id)
+        await q.message.edit_text(
             f"🚀 **Extraction Started**\n\n"
-            f"📚 `{batch}`\n📢 `{ch['id']}`\n\n"
-            f"⏳ Initializing... _(15-30 min)_",
+            + "".join(f"📚 `{b}`\n" for b in names) + f"📢 `{ch['id']}`\n\n"
+            + (f"🕒 Queued — {ahead} job(s) ahead of you." if ahead else
+               "⏳ Initializing... _(15-30 min)_"),
             parse_mode="markdown"
         )
-        asyncio.create_task(_workflow(bot, uid, smsg, batch, ch["id"]))
-
-    async def _workflow(bot, uid, smsg, batch, channel_id):
-        u       = get_user(uid)
-        token   = u["token"]
-        ext_bot = u.get("extractor_bot", "@pwextract_bot")
-        upl_bot = u.get("uploader_bot",  "@Mahira_uploder_24bot")
-        cmd     = u["uploader_cmd"]
-        credit  = u["credit_name"]
-        job_id  = create_job(uid, batch, channel_id)
-        _active[uid] = job_id
-
-        log = []
-
-        async def st(line):
-            log.append(line)
-            lines = "\n".join(f"  `{l}`" for l in log[-5:])
-            try:
-                await smsg.edit_text(
-                    f"⚙️ **Running...**\n\n"
-                    f"📚 `{batch}`\n📢 `{channel_id}`\n\n"
-                    f"**Log:**\n{lines}",
-                    parse_mode="markdown"
-                )
-            except Exception:
-                pass
+        jobqueue.wake()
 
-        async def prog(v, p):
-            try:
-                await smsg.edit_text(
-                    f"📤 **Forwarding...**\n\n"
-                    f"📚 `{batch}`\n📢 `{channel_id}`\n\n"
-                    f"🎬 Videos: **{v}**\n📄 PDFs: **{p}**\n\n"
-                    f"_Still running..._",
-                    parse_mode="markdown"
-                )
-            except Exception:
-                pass
 
+async def run_extraction_job(bot, job: dict):
+    """Run one claimed job row (see core/jobqueue.py)."""
+    uid        = job["user_id"]
+    names      = job_batches(job)
+    channel_id = job["channel_id"]
+    job_id     = job["id"]
+    u       = await get_user(uid)
+    token   = u["token"]
+    ext_bot = u.get("extractor_bot", "@pwextract_bot")
+    upl_bot = u.get("uploader_bot",  "@Mahira_uploder_24bot")
+    cmd     = u["uploader_cmd"]
+    credit  = u["credit_name"]
+    metrics = job_metrics()
+
+    async def show(text):
+        if not job["status_msg"]:
+            return
         try:
-            txt_path = await run_extractor(ext_bot, token, batch, cb=st)
-            result   = await run_uploader(
-                upl_bot, cmd, txt_path, batch, credit, token,
-                [channel_id], status_cb=st, progress_cb=prog
-            )
-            v, p = result["videos"], result["pdfs"]
-            finish_job(job_id, "done", videos=v, pdfs=p)
-            _active.pop(uid, None)
-            await smsg.edit_text(
-                f"✅ **Done!**\n\n"
-                f"📚 `{batch}`\n📢 `{channel_id}`\n\n"
-                f"🎬 Videos forwarded: **{v}**\n"
-                f"📄 PDFs forwarded: **{p}**\n\n"
-                f"_Use /StartExtraction for another batch._",
-                parse_mode="markdown"
+            await ratelimit.call(
+                "edit", bot.edit_message_text, job["status_chat"], job["status_msg"],
+                text, parse_mode="markdown", key=uid
             )
+        except Exception:
+            pass
 
-        except ExtractorError as e:
-            _active.pop(uid, None)
-            err = str(e)
-            finish_job(job_id, "failed", error=err)
-            if "TOKEN_EXPIRED" in err:
-                await smsg.edit_text(
-                    "❌ **Token Expired!**\n\n"
-                    "Hello! Current PW token is expired.\n"
-                    "Please set a new one: /SetToken\n\n"
-                    "Then try /StartExtraction again.",
-                    parse_mode="markdown"
-                )
-            else:
-                await smsg.edit_text(
-                    f"❌ **Phase 1 Failed**\n\n`{err[:300]}`\n\nTry /StartExtraction again.",
-                    parse_mode="markdown"
+    # st/prog only update the view; it edits the message on its own schedule
+    header = "".join(f"📚 `{b}`\n" for b in names) + f"📢 `{channel_id}`"
+    view   = JobRenderer(show, header)
+    st, prog = view.line, view.progress
+
+    def checkpoint(ck):
+        # queued behind earlier writes, never awaited by the monitor
+        aio.submit(save_checkpoint, job_id, ck)
+
+    # over all batches: copies that never reached the channel, and
+    # expected files the uploader never posted (the monitor stopped short)
+    lost = {"failed": 0, "dead": None, "missing": 0}
+
+    def tally(result: dict):
+        s = result["channels"][channel_id]
+        lost["failed"] += s["failed"]
+        lost["dead"] = lost["dead"] or s["dead"]
+        lost["missing"] += result["missing"]
+
+    if job["attempts"] > 1:
+        await st(f"♻️ Restarted after an interruption (attempt {job['attempts']})")
+
+    async def new_items(name: str, txt):
+        # → (what to send the uploader, manifest items it will post, items left out);
+        #   items is None when the .txt can't be read — it is then sent whole
+        src = await manifest.fetch(txt, workdir)
+        dst = os.path.join(workdir, "new", txt.file_name)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        delivered = await get_delivered(uid, name, channel_id)
+        items, dropped = manifest.filter_new(src, dst, delivered, int(START_INDEX))
+        return (dst if dropped else txt), items, dropped
+
+    def delivered_keys(items: list, result: dict, before: int) -> list:
+        # ledger entries for a batch: all of them, or none. Forwarded files
+        # can't be told apart by item (the uploader may skip one), so only a
+        # batch whose every file reached the channel (copied or already
+        # there) is recorded; anything short is retried whole next time.
+        n = result["videos"] + result["pdfs"] - before
+        s = result["channels"][channel_id]
+        if n < manifest.files(items) or s["failed"] or s["dead"] or s.get("handled", 0) < n:
+            return []
+        return [e.key for e in items]
+
+    async def resumed_keys(name: str, ck: dict, result: dict) -> list:
+        # the interrupted batch's ledger entries, rebuilt from the cached .txt
+        ref = txtcache.get(ext_bot, name, WAIT_CHOICE)
+        if not (ref and ck["expect"]):
+            return []
+        try:
+            _, items, _ = await new_items(name, TxtRef(**ref))
+        except Exception:
+            return []
+        return delivered_keys(items, result, ck["expect"] - manifest.files(items))
+
+    async def upload_all(todo: list, result: dict) -> dict:
+        # Batch N+1 is extracted (same login) while batch N is uploading
+        ready = asyncio.Queue()
+
+        async def extract():
+            try:
+                async with aclosing(extract_batches(ext_bot, token, todo, cb=st)) as it:
+                    async for item in it:
+                        ready.put_nowait(item)
+            except Exception as e:
+                ready.put_nowait(e)
+
+        view.set_phase("extract")
+        producer = asyncio.get_running_loop().create_task(extract())
+        try:
+            for _ in todo:
+                item = await ready.get()
+                if isinstance(item, Exception):
+                    raise item
+                name, txt = item
+                n = names.index(name) + 1
+                if len(names) > 1:
+                    await st(f"📦 Uploading batch {n}/{len(names)}: {name}")
+                view.set_phase("upload")
+                try:
+                    send, items, dropped = await new_items(name, txt)
+                except Exception as e:
+                    await st(f"⚠️ Couldn't read the txt ({e}) — sending it whole, no ETA")
+                    send, items, dropped = txt, None, 0
+                before, expect = result["videos"] + result["pdfs"], None
+                if items is not None:
+                    if dropped:
+                        await st(f"🧾 {dropped} item(s) already delivered before")
+                    if not manifest.files(items):
+                        await st(f"✅ Nothing new in {name} — skipping the uploader")
+                        await advance_batch(job_id, result["videos"], result["pdfs"])
+                        continue
+                    expect = before + manifest.files(items)
+                    view.expect(expect)
+                    await st(f"📋 Expecting {manifest.files(items)} file(s)")
+                result = await run_uploader(
+                    upl_bot, cmd, send, name, credit, token,
+                    [channel_id], status_cb=st, progress_cb=prog, checkpoint_cb=checkpoint,
+                    counts=(result["videos"], result["pdfs"]), workdir=workdir, expect=expect,
+                    job_id=job_id
                 )
+                tally(result)
+                await advance_batch(job_id, result["videos"], result["pdfs"],
+                                    delivered_keys(items or [], result, before))
+        finally:
+            producer.cancel()
+        return result
 
-        except UploaderError as e:
-            _active.pop(uid, None)
-            finish_job(job_id, "failed", error=str(e))
-            await smsg.edit_text(
-                f"❌ **Phase 2 Failed**\n\n`{str(e)[:300]}`\n\nTry /StartExtraction again.",
-                parse_mode="markdown"
+    result = {"videos": job["videos_forwarded"] or 0, "pdfs": job["pdfs_forwarded"] or 0}
+    done   = job["batches_done"] or 0
+    workdir = tempfile.mkdtemp(prefix=f"job{job_id}_")   # downloaded .txt files
+    try:
+        ck = load_checkpoint(job)
+        if ck:
+            view.set_phase("forward")
+            if ck["expect"]:
+                view.expect(ck["expect"])
+            await st(f"⏩ Resuming forwarding after message {ck['last_msg_id']}")
+            result = await resume_uploader(
+                ck, [channel_id], status_cb=st, progress_cb=prog, checkpoint_cb=checkpoint
             )
+            tally(result)
+            await advance_batch(job_id, result["videos"], result["pdfs"],
+                                await resumed_keys(names[done], ck, result))
+            done += 1
+        if names[done:]:
+            result = await upload_all(names[done:], result)
+        v, p = result["videos"], result["pdfs"]
+        notes = ""
+        if lost["missing"]:
+            notes += f"⏳ Never posted by the uploader: **{lost['missing']}** file(s)\n"
+            await finish_job(job_id, "incomplete", videos=v, pdfs=p,
+                             error=f"{lost['missing']} expected file(s) never arrived")
+        else:
+            await finish_job(job_id, "done", videos=v, pdfs=p)
+        if lost["failed"]:
+            notes += f"❌ Copies failed: **{lost['failed']}**\n"
+            if lost["dead"]:
+                notes += f"_Can't post to the channel (`{lost['dead']}`) — check the userbot is an admin._\n"
+        title = ("⚠️ **Incomplete — some files never came from the uploader**" if lost["missing"] else
+                 "⚠️ **Done — some files didn't reach the channel**" if lost["failed"] else
+                 "✅ **Done!**")
+        await view.close(
+            f"{title}\n\n{header}\n\n"
+            f"🎬 Videos forwarded: **{v}**\n"
+            f"📄 PDFs forwarded: **{p}**\n"
+            f"{notes}\n"
+            f"_Use /StartExtraction for another batch, or_ `/Replicate {job_id}` "
+            f"_to copy these files to another channel._"
+        )
 
-        except Exception as e:
-            _active.pop(uid, None)
-            finish_job(job_id, "failed", error=str(e))
-            await smsg.edit_text(
-                f"❌ **Unexpected Error**\n\n`{str(e)[:300]}`\n\nContact admin.",
-                parse_mode="markdown"
+    except ExtractorError as e:
+        err = str(e)
+        await finish_job(job_id, "failed", error=err)
+        if "TOKEN_EXPIRED" in err:
+            await view.close(
+                "❌ **Token Expired!**\n\n"
+                "Hello! Current PW token is expired.\n"
+                "Please set a new one: /SetToken\n\n"
+                "Then try /StartExtraction again."
             )
+        else:
+            await view.close(
+                f"❌ **Phase 1 Failed**\n\n`{err[:300]}`\n\nTry /StartExtraction again."
+            )
+
+    except UploaderError as e:
+        await finish_job(job_id, "failed", error=str(e))
+        await view.close(
+            f"❌ **Phase 2 Failed**\n\n`{str(e)[:300]}`\n\nTry /StartExtraction again."
+        )
+
+    except Exception as e:
+        await finish_job(job_id, "failed", error=str(e))
+        await view.close(
+            f"❌ **Unexpected Error**\n\n`{str(e)[:300]}`\n\nContact admin."
+        )
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        await view.close()
+        print(f"[JOB {job_id}] timing: {metrics.summary()} · {view.edits} status edits")
+        if metrics.steps:
+            await add_step_stats(metrics.steps)
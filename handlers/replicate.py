@@ -0,0 +1,142 @@
+"""
+handlers/replicate.py
+/Replicate <job> — copy a finished job's files to another channel.
+
+The files are copied straight from the uploader chat, using the
+message ids the job recorded in media_deliveries. Neither peer bot is
+involved. The copy runs as a 'replicate' row in the durable job queue
+and goes through the same bulk, rate-limited Forwarder as a live job.
+Files the channel already has are skipped, so a retried run does not
+post anything twice.
+"""
+
+from itertools import groupby
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery
+from db.aio import (
+    upsert_user, get_job, get_open_job, get_channels, get_job_media,
+    create_replica_job, queue_position, finish_job, is_sudo
+)
+from utils.helpers import is_allowed, channels_keyboard
+from utils.states import set_state, get_state, clear_state, set_data, get_data
+from utils.progress import JobRenderer
+from core.userbot import ub_messages
+from core.forwarder import Forwarder, file_uid
+from core import ratelimit, jobqueue
+
+
+def register_replicate(bot: Client):
+
+    @bot.on_message(filters.command("Replicate") & filters.private)
+    async def cmd_replicate(_, msg: Message):
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        uid = msg.from_user.id
+
+        if not await is_allowed(uid):
+            return await msg.reply("❌ No access. Contact admin.")
+        parts = msg.text.split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            return await msg.reply("Usage: `/Replicate <job id>`", parse_mode="markdown")
+        job = await get_job(int(parts[1]))
+        if not job or (job["user_id"] != uid and not await is_sudo(uid)):
+            return await msg.reply("❌ No such job.")
+        if job["status"] not in ("done", "incomplete"):
+            return await msg.reply("⚠️ Only finished jobs can be replicated.")
+        if not await get_job_media(job["id"]):
+            return await msg.reply("⚠️ That job has no recorded files to copy.")
+        if await get_open_job(uid):
+            return await msg.reply("⚠️ A job is already running! Wait for it to finish.")
+
+        chs = [ch for ch in await get_channels(uid) if ch["id"] != job["channel_id"]]
+        if not chs:
+            return await msg.reply("⚠️ Add another channel first: /SetMLChannels")
+        set_state(uid, "rep_channel")
+        set_data(uid, "rep_job", job["id"])
+        set_data(uid, "rep_chs", chs)
+        await msg.reply(
+            f"🔁 **Replicate Job #{job['id']}**\n\n📚 `{job['batch_name']}`\n\n"
+            "**Select the channel to copy to:**",
+            reply_markup=channels_keyboard(chs, prefix="rc"),
+            parse_mode="markdown"
+        )
+
+    @bot.on_callback_query(filters.regex(r"^rc:\d+$"))
+    async def cb_channel(_, q: CallbackQuery):
+        uid = q.from_user.id
+        if get_state(uid) != "rep_channel":
+            return await q.answer("Session expired — run /Replicate again.")
+        idx = int(q.data.split(":")[1])
+        chs = get_data(uid, "rep_chs", [])
+        if idx >= len(chs):
+            return await q.answer("Invalid.")
+        ch     = chs[idx]
+        source = await get_job(get_data(uid, "rep_job"))
+        clear_state(uid)
+        if await get_open_job(uid):
+            return await q.answer("⚠️ A job is already running!")
+        await q.answer("🔁 Starting!")
+        job_id = await create_replica_job(uid, source, ch["id"], q.message.chat.id, q.message.id)
+        ahead  = await queue_position(job_id)
+        await q.message.edit_text(
+            f"🔁 **Replication Queued**\n\n"
+            f"📚 `{source['batch_name']}` (job #{source['id']})\n📢 `{ch['id']}`\n\n"
+            + (f"🕒 {ahead} job(s) ahead of you." if ahead else "⏳ Starting..."),
+            parse_mode="markdown"
+        )
+        jobqueue.wake()
+
+
+async def run_replicate_job(bot, job: dict):
+    """Run one claimed 'replicate' job row (see core/jobqueue.py)."""
+    job_id     = job["id"]
+    channel_id = job["channel_id"]
+
+    async def show(text):
+        if not job["status_msg"]:
+            return
+        try:
+            await ratelimit.call(
+                "edit", bot.edit_message_text, job["status_chat"], job["status_msg"],
+                text, parse_mode="markdown", key=job["user_id"]
+            )
+        except Exception:
+            pass
+
+    header = f"🔁 Job #{job['source_job']} → 📢 `{channel_id}`"
+    view   = JobRenderer(show, header)
+    view.set_phase("forward")
+    try:
+        media = await get_job_media(job["source_job"])
+        kinds = {(r["src_chat"], r["src_msg_id"]): r["kind"] for r in media}
+        view.expect(len(media))
+        v = p = missing = 0
+        for chat, rows in groupby(media, key=lambda r: r["src_chat"]):
+            ids  = [r["src_msg_id"] for r in rows]
+            msgs = await ub_messages(chat, ids)
+            missing += len(ids) - len(msgs)
+            fwd = Forwarder(chat, [channel_id], job_id=job_id)
+            for m in msgs:
+                await fwd.put(m)
+            s = (await fwd.close())[channel_id]
+            if s["dead"]:
+                raise RuntimeError(f"Can't post to {channel_id} ({s['dead']})")
+            have = fwd.have[channel_id]
+            for m in msgs:
+                if file_uid(m) in have:
+                    if kinds[(chat, m.id)] == "video": v += 1
+                    elif kinds[(chat, m.id)] == "pdf": p += 1
+            await view.progress(v, p)
+            await view.line(f"{chat}: {s['copied']} copied, {s['skipped']} already there, "
+                            f"{s['failed']} failed")
+
+        await finish_job(job_id, "done", videos=v, pdfs=p)
+        await view.close(
+            f"✅ **Replicated!**\n\n{header}\n\n"
+            f"🎬 Videos: **{v}**\n📄 PDFs: **{p}**"
+            + (f"\n⚠️ {missing} file(s) no longer in the uploader chat" if missing else "")
+        )
+    except Exception as e:
+        await finish_job(job_id, "failed", error=str(e))
+        await view.close(f"❌ **Replication Failed**\n\n`{str(e)[:300]}`")
+    finally:
+        await view.close()
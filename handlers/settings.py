@@ -1,6 +1,6 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
-from db.database import (
+from db.aio import (
     upsert_user, set_token, set_extractor, set_uploader,
     set_uploader_cmd, set_credit,
     add_batch, del_batch, get_batches,
@@ -18,7 +18,7 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetToken") & filters.private)
     async def c_set_token(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         set_state(msg.from_user.id, "token")
         await msg.reply(
             "🔑 **Set PW Token**\n\nSend your JWT access token.\n"
@@ -28,7 +28,7 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetExtractor") & filters.private)
     async def c_set_ext(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         set_state(msg.from_user.id, "extractor")
         await msg.reply(
             "🤖 **Set Extractor Bot**\n\nSend username.\n"
@@ -38,7 +38,7 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetUploader") & filters.private)
     async def c_set_upl(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         set_state(msg.from_user.id, "uploader")
         await msg.reply(
             "📤 **Set Uploader Bot**\n\nSend username.\n"
@@ -48,7 +48,7 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetupCommand") & filters.private)
     async def c_set_cmd(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         set_state(msg.from_user.id, "upl_cmd")
         await msg.reply(
             "🔐 **Set Uploader Secret Command**\n\n"
@@ -59,7 +59,7 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetupCredit") & filters.private)
     async def c_set_credit(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         set_state(msg.from_user.id, "credit")
         await msg.reply(
             "✍️ **Set Credit Name**\n\n"
@@ -82,38 +82,38 @@ def register_settings(bot: Client):
         if state == "token":
             if len(text) < 50:
                 return await msg.reply("❌ Too short — send a valid JWT token.")
-            set_token(uid, text)
+            await set_token(uid, text)
             clear_state(uid)
             await msg.reply("✅ **Token saved!**", parse_mode="markdown")
 
         elif state == "extractor":
             val = text if text != "/skip" else "@pwextract_bot"
-            set_extractor(uid, val)
+            await set_extractor(uid, val)
             clear_state(uid)
             await msg.reply(f"✅ Extractor set: `{val}`", parse_mode="markdown")
 
         elif state == "uploader":
             val = text if text != "/skip" else "@Mahira_uploder_24bot"
-            set_uploader(uid, val)
+            await set_uploader(uid, val)
             clear_state(uid)
             await msg.reply(f"✅ Uploader set: `{val}`", parse_mode="markdown")
 
         elif state == "upl_cmd":
             if not text.startswith("/"):
                 return await msg.reply("❌ Must start with `/`")
-            set_uploader_cmd(uid, text)
+            await set_uploader_cmd(uid, text)
             clear_state(uid)
             await msg.reply(f"✅ Command set: `{text}`", parse_mode="markdown")
 
         elif state == "credit":
-            set_credit(uid, text)
+            await set_credit(uid, text)
             clear_state(uid)
             await msg.reply(f"✅ Credit set: `{text}`", parse_mode="markdown")
 
         elif state == "add_batch":
             if len(text) < 3:
                 return await msg.reply("❌ Batch name too short.")
-            add_batch(uid, text)
+            await add_batch(uid, text)
             clear_state(uid)
             await msg.reply(f"✅ Batch added: `{text}`", parse_mode="markdown")
             await _show_batches(bot, uid, msg.chat.id)
@@ -125,7 +125,7 @@ def register_settings(bot: Client):
                     "❌ Send a numeric channel ID.\nExample: `-1001234567890`\n\n"
                     "Get it: forward a message from your channel to @userinfobot"
                 )
-            add_channel(uid, cid, f"Channel {cid}")
+            await add_channel(uid, cid, f"Channel {cid}")
             clear_state(uid)
             await msg.reply(f"✅ Channel added: `{cid}`", parse_mode="markdown")
             await _show_channels(bot, uid, msg.chat.id)
@@ -136,14 +136,14 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetMLBatches") & filters.private)
     async def c_batches(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         await _show_batches(bot, msg.from_user.id, msg.chat.id)
 
     @bot.on_callback_query(filters.regex(r"^delbatch:"))
     async def cb_del_batch(_, q: CallbackQuery):
         uid  = q.from_user.id
         name = q.data.split(":", 1)[1]
-        del_batch(uid, name)
+        await del_batch(uid, name)
         await q.answer(f"Removed: {name[:25]}")
         await _show_batches(bot, uid, q.message.chat.id, q.message.id)
 
@@ -163,14 +163,14 @@ def register_settings(bot: Client):
 
     @bot.on_message(filters.command("SetMLChannels") & filters.private)
     async def c_channels(_, msg: Message):
-        if not _chk(msg): return
+        if not await _chk(msg): return
         await _show_channels(bot, msg.from_user.id, msg.chat.id)
 
     @bot.on_callback_query(filters.regex(r"^delchan:"))
     async def cb_del_chan(_, q: CallbackQuery):
         uid = q.from_user.id
         cid = q.data.split(":", 1)[1]
-        del_channel(uid, cid)
+        await del_channel(uid, cid)
         await q.answer(f"Removed: {cid}")
         await _show_channels(bot, uid, q.message.chat.id, q.message.id)
 
@@ -194,15 +194,15 @@ def register_settings(bot: Client):
 
 # ── Helpers ──
 
-def _chk(msg: Message) -> bool:
-    upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
-    if not is_allowed(msg.from_user.id):
+async def _chk(msg: Message) -> bool:
+    await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+    if not await is_allowed(msg.from_user.id):
         return False
     return True
 
 
 async def _show_batches(bot, uid, chat_id, edit_id=None):
-    batches = get_batches(uid)
+    batches = await get_batches(uid)
     text    = "📚 **Your Batches**\n\n"
     text   += "".join(f"`{i+1}. {b}`\n" for i, b in enumerate(batches)) if batches else "_None saved yet_\n"
     text   += "\n_Tap to remove, or add new:_"
@@ -219,7 +219,7 @@ async def _show_batches(bot, uid, chat_id, edit_id=None):
 
 
 async def _show_channels(bot, uid, chat_id, edit_id=None):
-    chs  = get_channels(uid)
+    chs  = await get_channels(uid)
     text = "📢 **Your Channels**\n\n"
     text += "".join(f"`{c['id']}`\n" for c in chs) if chs else "_None saved yet_\n"
     text += "\n_Tap to remove, or add new:_"
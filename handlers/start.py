@@ -1,6 +1,6 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from db.database import upsert_user, get_user, get_batches, get_channels, get_missing, is_subscribed
+from db.aio import upsert_user, get_user, get_batches, get_channels, get_missing, is_subscribed, is_sudo
 from utils.helpers import is_allowed
 
 
@@ -8,9 +8,9 @@ def register_start(bot: Client):
 
     @bot.on_message(filters.command("start") & filters.private)
     async def cmd_start(_, msg: Message):
-        upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
         name   = msg.from_user.first_name or "User"
-        access = is_allowed(msg.from_user.id)
+        access = await is_allowed(msg.from_user.id)
 
         if access:
             kb = InlineKeyboardMarkup([
@@ -39,7 +39,7 @@ def register_start(bot: Client):
 
     @bot.on_message(filters.command("help") & filters.private)
     async def cmd_help(_, msg: Message):
-        upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
         await msg.reply(
             "📖 **Commands**\n"
             "━━━━━━━━━━━━━━━━━━━\n\n"
@@ -53,6 +53,7 @@ def register_start(bot: Client):
             "`/SetMLChannels` — Manage channels\n\n"
             "**🚀 Main**\n"
             "`/StartExtraction` — Begin workflow\n"
+            "`/Replicate [job]` — Copy a finished job to another channel\n"
             "`/status` — Your settings\n"
             "`/me` — Subscription info\n\n"
             "**👑 Admin Only**\n"
@@ -66,18 +67,17 @@ def register_start(bot: Client):
 
     @bot.on_message(filters.command("status") & filters.private)
     async def cmd_status(_, msg: Message):
-        upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
-        if not is_allowed(msg.from_user.id):
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        if not await is_allowed(msg.from_user.id):
             return await msg.reply("❌ No access.")
         await _send_status(bot, msg.from_user.id, msg.chat.id)
 
     @bot.on_message(filters.command("me") & filters.private)
     async def cmd_me(_, msg: Message):
-        upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
+        await upsert_user(msg.from_user.id, msg.from_user.username, msg.from_user.first_name)
         uid = msg.from_user.id
-        u   = get_user(uid)
-        from db.database import is_sudo
-        role   = "👑 Sudo" if is_sudo(uid) else ("✅ Subscribed" if is_subscribed(uid) else "❌ Not Subscribed")
+        u   = await get_user(uid)
+        role   = "👑 Sudo" if await is_sudo(uid) else ("✅ Subscribed" if await is_subscribed(uid) else "❌ Not Subscribed")
         expiry = (u or {}).get("sub_expiry", "—")
         await msg.reply(
             f"👤 **Account Info**\n"
@@ -106,10 +106,10 @@ def register_start(bot: Client):
 
 
 async def _send_status(bot, uid, chat_id):
-    u        = get_user(uid)
-    batches  = get_batches(uid)
-    channels = get_channels(uid)
-    missing  = get_missing(uid)
+    u        = await get_user(uid)
+    batches  = await get_batches(uid)
+    channels = await get_channels(uid)
+    missing  = await get_missing(uid)
 
     def ck(v): return "✅" if v else "❌"
 
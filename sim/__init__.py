@@ -0,0 +1,18 @@
+"""
+sim — offline peer-bot simulator.
+
+Import this package before config/db: it fills in dummy credentials,
+points DB_PATH at a throwaway file and shortens pacing so a full job
+runs in seconds. Nothing here talks to Telegram.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("BOT_TOKEN", "0:sim")
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "sim")
+os.environ.setdefault("SESSION_STRING", "sim")
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(prefix="pwsim_"), "bot.db"))
+os.environ.setdefault("UB_MIN_GAP", "0.02")
+os.environ.setdefault("UB_GAP_POLL", "1")
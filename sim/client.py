@@ -0,0 +1,273 @@
+"""
+sim/client.py
+In-process stand-in for the Pyrogram userbot Client.
+
+Implements the handful of methods core/ uses (send, history, copy,
+download, callback clicks …) against in-memory chats, and pushes peer
+replies through the registered MessageHandlers exactly like a live
+client would. Peer bots (sim/peers.py) are attached by username.
+"""
+
+import asyncio
+import os
+import random
+from collections import Counter
+from datetime import datetime
+from pyrogram import enums, raw
+from pyrogram.errors import FloodWait, ChatWriteForbidden, ChatForwardsRestricted, MessageIdInvalid
+from pyrogram.handlers import MessageHandler
+from pyrogram.types import Message, Chat, User, Document, Video
+
+ME_ID = 777000111
+
+
+class SimClient:
+    """
+    Fake userbot account.
+
+    drop_updates   — probability a peer message is stored but its update
+                     is never delivered (exercises gap filling)
+    flood_every    — every Nth copy/forward raises FloodWait(flood_secs)
+    broken_chats   — destination ids whose copies fail (ChatWriteForbidden)
+    protected      — peer usernames whose files can't be copied or re-sent
+                     (ChatForwardsRestricted; exercises the download path)
+    """
+
+    def __init__(self, drop_updates=0.0, flood_every=0, flood_secs=1,
+                 broken_chats=(), protected=(), seed=1):
+        self.is_connected = True
+        self.peers:    dict[str, object] = {}
+        self.chats:    dict[int, Chat] = {}
+        self.history:  dict[int, list[Message]] = {}   # chat_id → msgs, oldest first
+        self.files:    dict[str, tuple] = {}            # file_id → (bytes, name)
+        self.handlers: list = []
+        self.calls = Counter()                           # method → count
+        self.drop_updates = drop_updates
+        self.flood_every  = flood_every
+        self.flood_secs   = flood_secs
+        self.broken_chats = {int(c) for c in broken_chats}
+        self.protected    = {p.lower().lstrip("@") for p in protected}
+        self.rand    = random.Random(seed)
+        self._pm_id  = 1000      # private chats share one id sequence
+        self._ch_ids: dict[int, int] = {}
+        self._copies = 0
+        self.me = User(id=ME_ID, is_self=True, first_name="Sim", username="sim_user")
+
+    # ── wiring ──
+
+    def attach(self, peer):
+        """Register a scripted peer bot; returns its chat id."""
+        cid = 5_000_000 + len(self.peers)
+        self.chats[cid] = Chat(id=cid, type=enums.ChatType.BOT,
+                               username=peer.username.lstrip("@"),
+                               first_name=peer.username.lstrip("@"))
+        self.history[cid] = []
+        self.peers[peer.username.lower().lstrip("@")] = peer
+        peer.bind(self, cid)
+        return cid
+
+    def add_channel(self, channel_id: int):
+        cid = int(channel_id)
+        self.chats[cid] = Chat(id=cid, type=enums.ChatType.CHANNEL, title=f"ch{cid}")
+        self.history[cid] = []
+
+    def add_handler(self, handler, group: int = 0):
+        self.handlers.append(handler)
+
+    def _cid(self, chat) -> int:
+        if isinstance(chat, int) or str(chat).lstrip("-").isdigit():
+            return int(chat)
+        return self.peers[str(chat).lower().lstrip("@")].chat_id
+
+    def _next_id(self, cid: int) -> int:
+        if self.chats[cid].type == enums.ChatType.CHANNEL:
+            self._ch_ids[cid] = self._ch_ids.get(cid, 0) + 1
+            return self._ch_ids[cid]
+        self._pm_id += 1
+        return self._pm_id
+
+    def _store(self, cid: int, outgoing: bool, **fields) -> Message:
+        peer = next((p for p in self.peers.values() if p.chat_id == cid), None)
+        sender = self.me if outgoing else (
+            User(id=cid, is_bot=True, username=peer.username.lstrip("@")) if peer else None
+        )
+        kind = next((k for k in ("video", "document", "photo") if fields.get(k)), None)
+        m = Message(
+            client=self, id=self._next_id(cid), chat=self.chats[cid],
+            from_user=sender, date=datetime.now(), outgoing=outgoing,
+            media=enums.MessageMediaType(kind) if kind else None, **fields
+        )
+        self.history[cid].append(m)
+        return m
+
+    async def deliver(self, cid: int, **fields) -> Message:
+        """A peer bot posts a message to the user."""
+        m = self._store(cid, outgoing=False, **fields)
+        if self.rand.random() >= self.drop_updates:
+            for h in self.handlers:
+                if isinstance(h, MessageHandler) and await h.check(self, m):
+                    await h.callback(self, m)
+        return m
+
+    def _to_peer(self, cid: int, m: Message):
+        peer = next((p for p in self.peers.values() if p.chat_id == cid), None)
+        if peer:
+            asyncio.get_running_loop().create_task(peer.receive(m))
+
+    # ── Client API used by core/ ──
+
+    async def get_me(self):
+        self.calls["get_me"] += 1
+        return self.me
+
+    async def get_chat(self, chat):
+        self.calls["get_chat"] += 1
+        return self.chats[self._cid(chat)]
+
+    async def send_message(self, chat_id, text, **kw) -> Message:
+        self.calls["send_message"] += 1
+        cid = self._cid(chat_id)
+        m = self._store(cid, outgoing=True, text=text)
+        self._to_peer(cid, m)
+        return m
+
+    async def send_document(self, chat_id, document, **kw) -> Message:
+        self.calls["send_document"] += 1
+        cid = self._cid(chat_id)
+        if document in self.files:
+            if any(m.document and m.document.file_id == document
+                   for p in self.protected for m in self.history[self._cid(p)]):
+                raise ChatForwardsRestricted()
+            data, name = self.files[document]
+        else:
+            with open(document, "rb") as f:
+                data = f.read()
+            name = os.path.basename(document)
+        doc = self.new_file(data, name)
+        m = self._store(cid, outgoing=True, document=doc)
+        self._to_peer(cid, m)
+        return m
+
+    async def get_chat_history(self, chat_id, limit: int = 0, offset_id: int = 0):
+        self.calls["get_chat_history"] += 1
+        msgs = self.history[self._cid(chat_id)]
+        n = 0
+        for m in reversed(msgs):
+            if offset_id and m.id >= offset_id:
+                continue
+            yield m
+            n += 1
+            if limit and n >= limit:
+                break
+
+    async def get_messages(self, chat_id, message_ids):
+        self.calls["get_messages"] += 1
+        by_id = {m.id: m for m in self.history[self._cid(chat_id)]}
+        many  = not isinstance(message_ids, int)
+        ids   = list(message_ids) if many else [message_ids]
+        out   = [by_id.get(i) or Message(id=i, empty=True) for i in ids]
+        return out if many else out[0]
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kw) -> Message:
+        self.calls["copy_message"] += 1
+        return self._copy(chat_id, from_chat_id, message_id)
+
+    async def copy_media_group(self, chat_id, from_chat_id, message_id, **kw) -> list[Message]:
+        self.calls["copy_media_group"] += 1
+        group = await self.get_media_group(from_chat_id, message_id)
+        return self._copy(chat_id, from_chat_id, [m.id for m in group])
+
+    async def get_media_group(self, chat_id, message_id) -> list[Message]:
+        self.calls["get_media_group"] += 1
+        msgs = self.history[self._cid(chat_id)]
+        gid  = next((m.media_group_id for m in msgs if m.id == message_id), None)
+        if gid is None:
+            raise ValueError("The message doesn't belong to a media group")
+        return [m for m in msgs if m.media_group_id == gid]
+
+    async def resolve_peer(self, chat):
+        return self._cid(chat)       # the sim's "input peer" is just the chat id
+
+    def rnd_id(self) -> int:
+        return self.rand.getrandbits(63)
+
+    async def invoke(self, query, **kw):
+        """Raw calls: only messages.ForwardMessages (bulk, drop_author) is modelled."""
+        if not isinstance(query, raw.functions.messages.ForwardMessages):
+            raise NotImplementedError(type(query).__name__)
+        self.calls["forward_messages"] += 1
+        sent = self._copy(query.to_peer, query.from_peer, query.id)
+        have = {m.id for m in self.history[self._cid(query.from_peer)]}
+        rids = [r for i, r in zip(query.id, query.random_id) if i in have]
+        return raw.types.Updates(
+            updates=[u for m, r in zip(sent, rids) for u in (
+                         raw.types.UpdateMessageID(id=m.id, random_id=r),
+                         raw.types.UpdateNewChannelMessage(
+                             message=raw.types.MessageEmpty(id=m.id), pts=0, pts_count=0))],
+            users=[], chats=[], date=0, seq=0,
+        )
+
+    def _copy(self, chat_id, from_chat_id, message_id):
+        """Copy one message (or, given a list of ids, each that exists) without a forward header."""
+        self._copies += 1
+        if self.flood_every and self._copies % self.flood_every == 0:
+            raise FloodWait(value=self.flood_secs)
+        dst = int(chat_id)
+        if dst in self.broken_chats:
+            raise ChatWriteForbidden()
+        src_cid = self._cid(from_chat_id)
+        if self.chats[src_cid].username and self.chats[src_cid].username.lower() in self.protected:
+            raise ChatForwardsRestricted()
+        if dst not in self.chats:
+            self.add_channel(dst)
+        many = not isinstance(message_id, int)
+        ids  = set(message_id) if many else {message_id}
+        src  = [m for m in self.history[src_cid] if m.id in ids]
+        if not many and not src:
+            raise MessageIdInvalid()
+        out = []
+        for s in src:
+            m = self._store(dst, outgoing=True, video=s.video, document=s.document,
+                            caption=s.caption, media_group_id=s.media_group_id)
+            self._to_peer(dst, m)
+            out.append(m)
+        return out if many else out[0]
+
+    async def download_media(self, message, file_name: str = None, **kw) -> str:
+        self.calls["download_media"] += 1
+        fid  = message if isinstance(message, str) else message.document.file_id
+        path = file_name or self.files[fid][1]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.files[fid][0])
+        return path
+
+    async def request_callback_answer(self, chat_id, message_id, callback_data, timeout=10):
+        self.calls["request_callback_answer"] += 1
+        cid  = self._cid(chat_id)
+        peer = next(p for p in self.peers.values() if p.chat_id == cid)
+        asyncio.get_running_loop().create_task(peer.callback(callback_data))
+        return True
+
+    async def stop(self):
+        self.is_connected = False
+
+    # ── helpers for peers ──
+
+    def new_file(self, data: bytes, name: str) -> Document:
+        n = len(self.files) + 1
+        file_id = f"simdoc{n}"
+        self.files[file_id] = (data, name)
+        return Document(file_id=file_id, file_unique_id=f"u{file_id}",
+                        file_name=name, file_size=len(data), mime_type="text/plain")
+
+    def new_media(self, kind: str, title: str, size: int) -> dict:
+        """Video / PDF fields for deliver(); ids derive from the title."""
+        key = "".join(c for c in title if c.isalnum())[:40]
+        if kind == "video":
+            return {"video": Video(file_id=f"v_{key}", file_unique_id=f"uv_{key}",
+                                   width=854, height=480, duration=60, file_size=size,
+                                   file_name=f"{title}.mp4")}
+        return {"document": Document(file_id=f"d_{key}", file_unique_id=f"ud_{key}",
+                                     file_name=f"{title}.pdf", file_size=size,
+                                     mime_type="application/pdf")}
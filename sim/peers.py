@@ -0,0 +1,232 @@
+"""
+sim/peers.py
+Scripted stand-ins for the peer bots the userbot talks to.
+
+ExtractorPeer behaves like @pwextract_bot (button → token → batch
+list → choice → .txt), UploaderPeer like @Mahira_uploder_24bot
+(secret command → .txt → prompts → videos/PDFs → done). Latency,
+wording, prompt order, media volume and failures are all knobs.
+"""
+
+import asyncio
+import re
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+
+class Peer:
+    def __init__(self, username: str, latency: float = 0.05, jitter: float = 0.0):
+        self.username = username
+        self.latency  = latency
+        self.jitter   = jitter
+        self.client   = None
+        self.chat_id  = 0
+        self.state    = None
+        self.seen: list[str] = []     # texts received, for assertions
+
+    def bind(self, client, chat_id: int):
+        self.client, self.chat_id = client, chat_id
+
+    async def say(self, text: str = None, delay: float = None, **fields):
+        wait = self.latency if delay is None else delay
+        if self.jitter:
+            wait += self.client.rand.uniform(0, self.jitter)
+        if wait:
+            await asyncio.sleep(wait)
+        if text is not None:
+            fields["text"] = text
+        return await self.client.deliver(self.chat_id, **fields)
+
+    async def receive(self, m):
+        if m.document:
+            data, _ = self.client.files[m.document.file_id]
+            self.seen.append(f"<doc {m.document.file_name}>")
+            await self.on_document(data.decode())
+        else:
+            self.seen.append(m.text)
+            await self.on_text(m.text.strip())
+
+    async def callback(self, data):
+        pass
+
+    async def on_text(self, text: str):
+        pass
+
+    async def on_document(self, content: str):
+        pass
+
+
+def make_manifest(batch: str, videos: int, pdfs: int, start: int = 1) -> str:
+    """A .txt in the extractor's `Title:URL` format (videos then their PDFs)."""
+    lines = []
+    for i in range(start, start + max(videos, pdfs)):
+        if i < start + videos:
+            lines.append(f"{batch} Lecture {i}:https://cdn.example/{i}/master.m3u8")
+        if i < start + pdfs:
+            lines.append(f"{batch} Notes {i}:https://cdn.example/{i}/notes.pdf")
+    return "\n".join(lines) + "\n"
+
+
+class ExtractorPeer(Peer):
+    """
+    batches     — names listed in the batch list (numbered from 1)
+    videos/pdfs — items in the .txt it returns
+    token_ok    — False → replies "Token expired" instead of the list
+    list_delay / choice_delay / txt_delay — extra server-side work time
+    silent      — step names it never answers ("start", "txt", …)
+    reuse       — after a .txt, accept another batch number without a new login
+    """
+
+    WORDING = {
+        "welcome": "👋 Welcome to PW Extractor!\nChoose a platform below.",
+        "token":   "🔑 Send your PW access token.",
+        "expired": "❌ Token expired or invalid. Login again.",
+        "list":    "📚 Your batches:\n\n",
+        "choice":  "Choose an option:\n1. Full Batch\n2. Today's Class",
+    }
+
+    def __init__(self, username="@pwextract_bot", batches=("Sim Batch",),
+                 videos=10, pdfs=3, token_ok=True, list_delay=0.1,
+                 choice_delay=0.05, txt_delay=0.1, wording=None, silent=(), reuse=True, **kw):
+        super().__init__(username, **kw)
+        self.batches  = list(batches)
+        self.videos, self.pdfs = videos, pdfs
+        self.token_ok = token_ok
+        self.delays   = {"list": list_delay, "choice": choice_delay, "txt": txt_delay}
+        self.wording  = {**self.WORDING, **(wording or {})}
+        self.silent   = set(silent)
+        self.reuse    = reuse
+        self.picked   = None
+
+    async def on_text(self, text):
+        if text == "/start":
+            self.state = "start"
+            if "start" in self.silent:
+                return
+            kb = InlineKeyboardMarkup([[InlineKeyboardButton("Physics Wallah", callback_data="pw")]])
+            await self.say(self.wording["welcome"], reply_markup=kb)
+        elif self.state == "token":
+            if not self.token_ok:
+                self.state = None
+                return await self.say(self.wording["expired"])
+            self.state = "batch"
+            listing = "\n".join(f"{i}. {b}" for i, b in enumerate(self.batches, 1))
+            await self.say(self.wording["list"] + listing, delay=self.delays["list"])
+        elif self.state == "batch" and text.isdigit():
+            self.picked = self.batches[int(text) - 1]
+            self.state  = "choice"
+            await self.say(self.wording["choice"], delay=self.delays["choice"])
+        elif self.state == "choice" and text in ("1", "2"):
+            self.state = "batch" if self.reuse else None
+            if "txt" in self.silent:
+                return
+            data = make_manifest(self.picked, self.videos, self.pdfs).encode()
+            name = re.sub(r"\W+", "_", self.picked) + ".txt"
+            await self.say(document=self.client.new_file(data, name),
+                           delay=self.delays["txt"])
+
+    async def callback(self, data):
+        if data == "pw" and self.state == "start":
+            self.state = "token"
+            await self.say(self.wording["token"])
+
+
+class UploaderPeer(Peer):
+    """
+    secret        — command that opens the upload flow
+    order         — prompt keys in the order they are asked
+    merge         — pairs of keys asked in one message
+    media_delay   — gap between posted files (0 → one burst)
+    album         — group this many consecutive videos into one album
+    stop_after    — post only this many files, then go quiet (no DONE)
+    skip          — item numbers (1-based, from the start index) it fails to post
+    done_text     — final message
+    """
+
+    WORDING = {
+        "welcome":    "🤖 Uploader bot online.",
+        "file":       "📄 Send me the .txt file.",
+        "index":      "📍 Send start index (kahan se start karna hai?)",
+        "batch":      "📚 Send batch name.",
+        "resolution": "🎬 Send resolution (480 / 720).",
+        "credit":     "✍️ Send credit name.",
+        "token":      "🔑 Send PW token.",
+        "thumbnail":  "🖼️ Send thumbnail URL or 'no'.",
+        "working":    "⏳ Processing your file...",
+    }
+    ORDER = ("index", "batch", "resolution", "credit", "token", "thumbnail")
+
+    def __init__(self, username="@Mahira_uploder_24bot", secret="/Mahi",
+                 order=ORDER, merge=(), media_delay=0.02, album=0,
+                 stop_after=None, skip=(), done_text="✅ All done!", wording=None,
+                 file_size=50_000_000, **kw):
+        super().__init__(username, **kw)
+        self.secret      = secret
+        self.order       = list(order)
+        self.merge       = [tuple(p) for p in merge]
+        self.media_delay = media_delay
+        self.album       = album
+        self.stop_after  = stop_after
+        self.skip        = set(skip)
+        self.done_text   = done_text
+        self.wording     = {**self.WORDING, **(wording or {})}
+        self.file_size   = file_size
+        self.items: list[tuple[str, str]] = []
+        self.answers: dict[str, str] = {}
+        self.queue: list[str] = []
+
+    async def on_text(self, text):
+        if text == "/start":
+            self.state = None
+            return await self.say(self.wording["welcome"])
+        if text == self.secret:
+            self.state   = "file"
+            self.answers = {}
+            return await self.say(self.wording["file"])
+        if self.state == "prompts" and self.queue:
+            self.answers[self.queue.pop(0)] = text
+            if not self.queue:
+                await self._next_prompt()
+
+    async def on_document(self, content):
+        if self.state != "file":
+            return
+        self.items = [
+            ("pdf" if url.strip().lower().endswith(".pdf") else "video", title.strip())
+            for title, _, url in (l.partition(":") for l in content.splitlines() if ":" in l)
+        ]
+        self.state = "prompts"
+        await self._next_prompt()
+
+    async def _next_prompt(self):
+        asked = set(self.answers)
+        todo  = [k for k in self.order if k not in asked]
+        if not todo:
+            self.state = "working"
+            await self.say(self.wording["working"])
+            asyncio.get_running_loop().create_task(self._post_media())
+            return
+        key  = todo[0]
+        pair = next((p for p in self.merge if p[0] == key), None)
+        self.queue = list(pair) if pair else [key]
+        await self.say("\n".join(self.wording[k] for k in self.queue))
+
+    async def _post_media(self):
+        start = int(self.answers.get("index", "1") or 1)
+        items = self.items[start - 1:]
+        if self.stop_after is not None:
+            items = items[:self.stop_after]
+        group, left = 0, 0
+        for n, (kind, title) in enumerate(items, 1):
+            if n in self.skip:
+                continue
+            fields = self.client.new_media(kind, title, self.file_size)
+            if kind == "video" and self.album:
+                if left == 0:
+                    group, left = group + 1, self.album
+                fields["media_group_id"] = f"album{group}"
+                left -= 1
+            else:
+                left = 0
+            await self.say(caption=title, delay=self.media_delay, **fields)
+        if self.stop_after is None:
+            await self.say(self.done_text)
@@ -0,0 +1,133 @@
+"""
+sim/run.py
+Run the real /StartExtraction workflow offline against simulated peers.
+
+  python -m sim.run --videos 20 --pdfs 5 --latency 0.1 --order credit,batch
+  python -m sim.run --batch "Batch A,Batch B,Batch C"     # one multi-batch job
+
+Runs on the virtual clock (sim/clock.py) unless --real-time is given;
+"wall" is then the modelled job time.
+"""
+
+import argparse
+import asyncio
+import json
+
+import sim  # noqa: F401  (env defaults before config is imported)
+from db.database import (
+    init_db, get_job, create_job, upsert_user, set_token, set_extractor,
+    set_uploader, set_uploader_cmd, set_credit, add_batch, add_channel
+)
+from core.userbot import use_client
+from core import ratelimit, jobqueue
+from handlers.extraction import run_extraction_job
+from sim.client import SimClient
+from sim.clock import run_virtual
+from sim.peers import ExtractorPeer, UploaderPeer
+
+USER_ID = 424242
+CHANNEL = "-1001000000001"
+
+
+class SimBot:
+    """Stands in for the bot Client — only status-message edits are used."""
+
+    STATUS_CHAT, STATUS_MSG = USER_ID, 1
+
+    def __init__(self, verbose: bool = False):
+        self.text, self.edits, self.verbose = "", 0, verbose
+
+    async def edit_message_text(self, chat_id, message_id, text, **kw):
+        self.text = text
+        self.edits += 1
+        if self.verbose:
+            print("── status ──\n" + text)
+
+
+def setup_user(batch: str | list, extractor: ExtractorPeer, uploader: UploaderPeer, channels):
+    init_db()
+    upsert_user(USER_ID, "sim_user", "Sim")
+    set_token(USER_ID, "eyJ" + "x" * 60)
+    set_extractor(USER_ID, extractor.username)
+    set_uploader(USER_ID, uploader.username)
+    set_uploader_cmd(USER_ID, uploader.secret)
+    set_credit(USER_ID, "@SimCredit")
+    for b in [batch] if isinstance(batch, str) else batch:
+        add_batch(USER_ID, b)
+    for ch in channels:
+        add_channel(USER_ID, ch, f"Channel {ch}")
+
+
+async def run_job(
+    batch: str | list = "Sim Batch",
+    client: SimClient = None,
+    extractor: ExtractorPeer = None,
+    uploader: UploaderPeer = None,
+    channel: str = CHANNEL,
+    verbose: bool = False,
+) -> dict:
+    """Run one full job; returns the job row plus simulator counters."""
+    client    = client or SimClient()
+    extractor = extractor or ExtractorPeer(batches=[batch] if isinstance(batch, str) else batch)
+    uploader  = uploader or UploaderPeer()
+    client.attach(extractor)
+    client.attach(uploader)
+    client.add_channel(channel)
+    use_client(client)
+    ratelimit.reset()
+    setup_user(batch, extractor, uploader, [channel])
+
+    bot  = SimBot(verbose)
+    loop = asyncio.get_running_loop()
+    t0   = loop.time()
+    await jobqueue.start(lambda job: run_extraction_job(bot, job), workers=1)
+    job_id = create_job(USER_ID, batch, channel, bot.STATUS_CHAT, bot.STATUS_MSG)
+    jobqueue.wake()
+    while get_job(job_id)["status"] in ("queued", "running") or jobqueue.busy():
+        await asyncio.sleep(1)
+    job = get_job(job_id)
+    wall = loop.time() - t0
+    await jobqueue.stop()
+
+    return {
+        "job":      job,
+        "wall":     round(wall, 3),
+        "calls":    dict(client.calls),
+        "copied":   len(client.history[int(channel)]),
+        "edits":    bot.edits,
+        "status":   bot.text,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline end-to-end job against fake peer bots")
+    ap.add_argument("--batch", default="Sim Batch", help="comma-separated → one multi-batch job")
+    ap.add_argument("--videos", type=int, default=10)
+    ap.add_argument("--pdfs", type=int, default=3)
+    ap.add_argument("--latency", type=float, default=0.05, help="peer reply latency (s)")
+    ap.add_argument("--media-delay", type=float, default=0.02, help="gap between posted files")
+    ap.add_argument("--order", default=",".join(UploaderPeer.ORDER), help="uploader prompt order")
+    ap.add_argument("--merge", default="", help="e.g. resolution+credit")
+    ap.add_argument("--album", type=int, default=0)
+    ap.add_argument("--drop", type=float, default=0.0, help="update drop probability")
+    ap.add_argument("--flood-every", type=int, default=0)
+    ap.add_argument("--expired", action="store_true", help="extractor rejects the token")
+    ap.add_argument("--no-reuse", action="store_true", help="extractor needs a new login per batch")
+    ap.add_argument("--real-time", action="store_true", help="real clock instead of virtual")
+    ap.add_argument("--verbose", action="store_true")
+    a = ap.parse_args()
+
+    client = SimClient(drop_updates=a.drop, flood_every=a.flood_every)
+    names = a.batch.split(",")
+    ext = ExtractorPeer(batches=["Other Batch", *names], videos=a.videos, pdfs=a.pdfs,
+                        token_ok=not a.expired, latency=a.latency, reuse=not a.no_reuse)
+    upl = UploaderPeer(order=a.order.split(","), latency=a.latency,
+                       merge=[m.split("+") for m in a.merge.split(",") if m],
+                       media_delay=a.media_delay, album=a.album)
+    job = run_job(names if len(names) > 1 else names[0], client, ext, upl, verbose=a.verbose)
+    out = asyncio.run(job) if a.real_time else run_virtual(job)
+    print(json.dumps(out, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,24 @@
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from db.database import is_banned, is_subscribed, is_sudo
+from db import aio
 
 
-def is_allowed(uid: int) -> bool:
-    return not is_banned(uid) and (is_sudo(uid) or is_subscribed(uid))
+async def is_allowed(uid: int) -> bool:
+    return await aio.is_allowed(uid)
 
 
-def batches_keyboard(batches: list, prefix="sb") -> InlineKeyboardMarkup:
+def batches_keyboard(batches: list, prefix="sb", selected=()) -> InlineKeyboardMarkup:
+    """Tap to toggle; "Next" appears once something is selected."""
     buttons = [
-        [InlineKeyboardButton(f"📚 {b[:38]}", callback_data=f"{prefix}:{i}")]
+        [InlineKeyboardButton(
+            f"{'✅' if i in selected else '📚'} {b[:38]}",
+            callback_data=f"{prefix}:{i}"
+        )]
         for i, b in enumerate(batches)
     ]
+    if selected:
+        buttons.append([InlineKeyboardButton(
+            f"➡️ Next ({len(selected)} selected)", callback_data=f"{prefix}:go"
+        )])
     return InlineKeyboardMarkup(buttons)
 
 
@@ -0,0 +1,134 @@
+"""
+utils/progress.py
+Status-message renderer for one job.
+
+Callbacks only update the renderer's state; a single flusher edits the
+message at most once every PROGRESS_EVERY seconds with the latest
+state (immediately on a phase change) and skips edits that would not
+change the text. While forwarding it shows throughput, and an ETA once
+the expected total is known.
+"""
+
+import asyncio
+import contextvars
+from config import PROGRESS_EVERY
+
+PHASES = {
+    "extract": "⚙️ **Extracting...**",
+    "upload":  "📤 **Sending to uploader...**",
+    "forward": "📤 **Forwarding...**",
+}
+
+
+def fmt_secs(secs: float) -> str:
+    secs = int(secs)
+    if secs >= 3600:
+        return f"{secs // 3600}h {secs % 3600 // 60}m"
+    if secs >= 60:
+        return f"{secs // 60}m {secs % 60}s"
+    return f"{secs}s"
+
+
+class JobRenderer:
+    def __init__(self, edit, header: str, every: float = PROGRESS_EVERY):
+        self._edit   = edit                 # async edit(text)
+        self.header  = header
+        self.every   = every
+        self.phase   = None
+        self.log     = []
+        self.videos  = self.pdfs = 0
+        self.total   = None                 # expected files, if known
+        self.edits   = self.skipped = 0
+        self._rate_from = None              # (time, files) when forwarding started
+        self._last_text = None
+        self._last_at   = float("-inf")
+        self._dirty  = asyncio.Event()
+        self._urgent = asyncio.Event()
+        # own context: edit pacing runs beside the job, not in its step timings
+        self._task   = asyncio.get_running_loop().create_task(
+            self._run(), context=contextvars.Context()
+        )
+
+    # ── state updates (never edit directly) ──
+    def set_phase(self, phase: str):
+        if phase != self.phase:
+            self.phase = phase
+            self._urgent.set()
+            self._dirty.set()
+
+    async def line(self, text: str):
+        self.log.append(text)
+        del self.log[:-5]
+        self._dirty.set()
+
+    async def progress(self, videos: int, pdfs: int):
+        if self._rate_from is None:
+            self._rate_from = (self._now(), videos + pdfs)
+        self.videos, self.pdfs = videos, pdfs
+        self.set_phase("forward")
+        self._dirty.set()
+
+    def expect(self, total: int):
+        self.total = total
+        self._dirty.set()
+
+    # ── output ──
+    def render(self) -> str:
+        text = f"{PHASES.get(self.phase, '⚙️ **Running...**')}\n\n{self.header}\n\n"
+        if self.phase == "forward":
+            done = self.videos + self.pdfs
+            text += f"🎬 Videos: **{self.videos}**\n📄 PDFs: **{self.pdfs}**"
+            if self.total:
+                text += f"  _({done}/{self.total})_"
+            text += "\n"
+            rate = self._rate()
+            if rate:
+                text += f"⚡ {rate * 60:.1f} files/min"
+                if self.total and self.total > done:
+                    text += f" · ⏳ ETA {fmt_secs((self.total - done) / rate)}"
+                text += "\n"
+            text += "\n"
+        if self.log:
+            text += "**Log:**\n" + "\n".join(f"  `{l}`" for l in self.log)
+        return text.rstrip()
+
+    async def close(self, final: str = None):
+        """Stop flushing; `final` replaces the progress view."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if final is not None:
+            await self._send(final)
+
+    # ── internals ──
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _rate(self) -> float | None:
+        if self._rate_from is None:
+            return None
+        t0, n0 = self._rate_from
+        elapsed = self._now() - t0
+        done    = self.videos + self.pdfs - n0
+        return done / elapsed if done > 0 and elapsed >= 1 else None
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            wait = self._last_at + self.every - self._now()
+            if wait > 0 and not self._urgent.is_set():
+                try:
+                    await asyncio.wait_for(self._urgent.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            self._dirty.clear()
+            self._urgent.clear()
+            await self._send(self.render())
+
+    async def _send(self, text: str):
+        if text == self._last_text:
+            self.skipped += 1
+            return
+        self._last_text = text
+        self._last_at   = self._now()
+        self.edits += 1
+        await self._edit(text)